@@ -520,14 +520,22 @@ function downloadEditedImage() {
   showToast('Downloaded image');
 }
 
-function loadExtractedImageIntoEditor(idx) {
+async function loadExtractedImageIntoEditor(idx) {
   if (!state.currentResults) return;
   const images = Array.isArray(state.currentResults._extracted_images) ? state.currentResults._extracted_images : [];
   const img = images[idx];
   if (!img?.data_url) return;
+  let dataUrl;
+  try {
+    dataUrl = await fetchDataUrl(img.data_url);
+  } catch (e) {
+    console.error('Failed to load extracted image', e);
+    showToast('Failed to load image');
+    return;
+  }
   extractedImageEditorState.activeIdx = idx;
-  extractedImageEditorState.originalDataUrl = img.data_url;
-  extractedImageEditorState.workingDataUrl = img.data_url;
+  extractedImageEditorState.originalDataUrl = dataUrl;
+  extractedImageEditorState.workingDataUrl = dataUrl;
   drawImageEditor();
 }
 
@@ -1009,6 +1017,26 @@ function getTemplateRootInfo(results) {
   return { root: results, prefix: '', templateType };
 }
 
+// Extracted images are served from `/jobs/{id}/images/{n}` (image_url), and repeated
+// PDF images point to their first placement via `duplicate_of`. Resolve a data_url
+// as a non-enumerable property so it is available for rendering but not written
+// back when results are saved.
+function hydrateExtractedImages(results) {
+  const images = Array.isArray(results?._extracted_images) ? results._extracted_images : [];
+  images.forEach((img) => {
+    if (!img || img.data_url) return;
+    let url = null;
+    if (img.image_url) {
+      url = `${API_BASE}/${img.image_url}`;
+    } else if (img.duplicate_of != null) {
+      const source = images[img.duplicate_of];
+      url = source?.data_url || (source?.image_url ? `${API_BASE}/${source.image_url}` : null);
+    }
+    if (!url) return;
+    Object.defineProperty(img, 'data_url', { value: url, enumerable: false, writable: true, configurable: true });
+  });
+}
+
 function ensureResultsObject(maybeResults) {
   if (!maybeResults) return null;
   if (typeof maybeResults === 'string') {
@@ -2918,13 +2946,21 @@ const roiModalState = {
   selectedRegion: null
 };
 
-function openImageRoiModal(imageIdx) {
+async function openImageRoiModal(imageIdx) {
   const images = window._extractedImages;
   if (!images || !images[imageIdx]) return;
   
   const img = images[imageIdx];
+  let imageData;
+  try {
+    imageData = await fetchDataUrl(img.data_url);
+  } catch (e) {
+    console.error('Failed to load extracted image', e);
+    showToast('Failed to load image');
+    return;
+  }
   roiModalState.imageIdx = imageIdx;
-  roiModalState.imageData = img.data_url;
+  roiModalState.imageData = imageData;
   roiModalState.currentRoi = null;
   roiModalState.selectedRois = [];
   roiModalState.selectedRegionIndices = [];
@@ -3010,7 +3046,7 @@ function openImageRoiModal(imageIdx) {
     // Auto-detect regions
     detectTextRegions();
   };
-  imgEl.src = img.data_url;
+  imgEl.src = imageData;
   
   // Reset UI
   document.getElementById('roi-extract-btn').disabled = true;
@@ -3958,7 +3994,14 @@ async function exportToExcel() {
 
         let rowCursor = 2;
         for (const img of images) {
-          const dataUrl = img?.data_url || '';
+          let dataUrl = img?.data_url || '';
+          if (dataUrl && !dataUrl.startsWith('data:')) {
+            try {
+              dataUrl = await fetchDataUrl(dataUrl);
+            } catch (e) {
+              console.warn('Failed to fetch extracted image', e);
+            }
+          }
           const match = /^data:image\/(png|jpe?g|webp|bmp|gif);base64,(.+)$/i.exec(dataUrl);
           const ext = match ? match[1].toLowerCase().replace('jpg', 'jpeg') : 'png';
           const base64 = match ? match[2] : null;
@@ -4027,6 +4070,23 @@ async function apiGet(path) {
   return parseJsonOrThrow(res, 'GET', path);
 }
 
+// Fetch an image URL (e.g. an extracted image served by the API) as a data URL so it
+// can be drawn on canvases, sent to OCR endpoints or embedded in exports.
+async function fetchDataUrl(url) {
+  if (!url || url.startsWith('data:')) return url;
+  const res = await fetch(url, {
+    headers: { 'ngrok-skip-browser-warning': 'true' },
+  });
+  if (!res.ok) throw new Error(`GET ${url} -> ${res.status}`);
+  const blob = await res.blob();
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+  });
+}
+
 async function apiPostForm(path, formData) {
   const res = await fetch(`${API_BASE}${path}`, {
     method: 'POST',
@@ -4138,7 +4198,7 @@ function scheduleSelectedJobRefresh(jobId, delayMs = 2000) {
   state.jobPollTimer = setTimeout(async () => {
     if (state.selectedJobId !== jobId) return;
     try {
-      const job = await apiGet(`/jobs/${jobId}`);
+      const job = await apiGet(`/jobs/${jobId}?include_results=completed`);
       renderJobDetail(job);
     } catch (e) {
       console.error('Auto-refresh failed', e);
@@ -4164,8 +4224,10 @@ function renderJobDetail(job) {
   
   // Store results for editing
   const normalizedResults = ensureResultsObject(job.results);
+  hydrateExtractedImages(normalizedResults);
   state.currentResults = normalizedResults ? JSON.parse(JSON.stringify(normalizedResults)) : null;
   if (state.currentResults) {
+    hydrateExtractedImages(state.currentResults);
     hydrateTargetBrandsIncDefaults(state.currentResults);
   }
   state.currentJob = job;
@@ -4269,6 +4331,7 @@ function renderJobDetail(job) {
         if (previewEl) previewEl.innerHTML = `<div class="empty-state"><i class="fas fa-exclamation-triangle"></i><p>Invalid JSON</p></div>`;
         return;
       }
+      hydrateExtractedImages(parsed);
       state.currentResults = parsed;
       tableIdCounter = 0;
       window.editableTables = {};
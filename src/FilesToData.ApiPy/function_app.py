@@ -1,6 +1,10 @@
+import base64
+import hashlib
 import json
 import logging
+import math
 import os
+import time
 import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, Tuple
@@ -8,14 +12,26 @@ from typing import Any, Dict, Optional, Tuple
 import azure.functions as func
 
 from services.ai_service import ai_service
+from services.http_pool import http_pool
 from services.masking_service import masking_service
-from services.ocr_service import ocr_service
+from services.multipart import MultipartForm, parse_multipart
+from services.ocr_cache import ocr_cache
+from services.ocr_service import image_media_type, ocr_service
+from services.page_renderer import page_renderer
+from services.page_sessions import PageImage, page_sessions
+from services.poll_scheduler import azure_di_poll_scheduler
 from services.queue_service import queue_service
+from services.spatial_index import word_index_cache
+from services.tesseract_pool import tesseract_pool
 from services.supabase_service import supabase
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 logger = logging.getLogger(__name__)
 
+# How long a queue worker's claim on a job lasts; keep it above the function timeout so
+# only jobs of workers that died are reclaimed
+JOB_LEASE_SECONDS = int((os.getenv("JOB_LEASE_SECONDS", "900").strip() or "900"))
+
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
@@ -24,8 +40,11 @@ def _utc_now_iso() -> str:
 def _cors_headers() -> Dict[str, str]:
     origin = (os.getenv("CORS_ALLOWED_ORIGIN") or "").strip() or "*"
     headers = {
-        "Access-Control-Allow-Methods": "GET,POST,PUT,OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type,Authorization,ngrok-skip-browser-warning",
+        "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+        "Access-Control-Allow-Headers": (
+            "Content-Type,Authorization,ngrok-skip-browser-warning,X-Regions,Range,If-Range,If-None-Match"
+        ),
+        "Access-Control-Expose-Headers": "ETag,Accept-Ranges,Content-Range,Content-Length,Content-Disposition",
         "Access-Control-Max-Age": "86400",
     }
     if origin.strip() == "*":
@@ -57,73 +76,270 @@ def _not_found(message: str) -> func.HttpResponse:
     return _json_response({"error": message}, status_code=404)
 
 
-def _parse_uuid(value: str) -> Optional[uuid.UUID]:
+def _not_modified(etag: str, extra_headers: Optional[Dict[str, str]] = None) -> func.HttpResponse:
+    headers = _cors_headers()
+    headers["ETag"] = etag
+    headers.update(extra_headers or {})
+    return func.HttpResponse(status_code=304, headers=headers)
+
+
+def _etag_matches(req: func.HttpRequest, etag: str) -> bool:
+    if_none_match = req.headers.get("if-none-match") or req.headers.get("If-None-Match") or ""
+    candidates = [c.strip() for c in if_none_match.split(",") if c.strip()]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single-range "bytes=" header; (size, size) if the range
+    cannot be satisfied. None when the header should be ignored (absent, malformed or
+    multiple ranges) and the whole file served.
+    """
+    unit, _, spec = (range_header or "").strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
     try:
-        return uuid.UUID(value)
-    except Exception:
+        if not first.strip():
+            suffix = int(last)
+            if suffix <= 0:
+                return (size, size)
+            return (max(0, size - suffix), size - 1)
+        start = int(first)
+        end = int(last) if last.strip() else max(start, size - 1)
+    except ValueError:
+        return None
+    if start < 0 or end < start:
         return None
+    if start >= size:
+        return (size, size)
+    return (start, min(end, size - 1))
+
+
+def _safe_file_name(file_name: str) -> str:
+    """Last path component of a client-supplied file name, usable as one storage key segment."""
+    name = os.path.basename(file_name.replace("\\", "/"))
+    name = "".join(ch for ch in name if ch >= " " and ch not in '/\\:"').strip()
+    return name if name and name not in (".", "..") else "file"
+
+
+def _job_image_path(job_id: str, n: int) -> str:
+    return f"uploads/{job_id}/images/{n}"
 
 
-def _parse_multipart_file(req: func.HttpRequest) -> Tuple[Optional[bytes], Optional[str]]:
-    # Prefer built-in parsing when available.
+def _job_image_store(job_id: str):
+    """Store extracted images next to the upload and return their API-relative URLs."""
+    counter = {"n": 0}
+
+    def _store(image_bytes: bytes) -> str:
+        n = counter["n"]
+        counter["n"] += 1
+        supabase.upload_file(_job_image_path(job_id, n), image_bytes)
+        return f"jobs/{job_id}/images/{n}"
+
+    return _store
+
+
+def _job_file_hash(job: Dict[str, Any]) -> str:
+    """SHA-256 of a job's uploaded file (recorded at upload; computed once and saved for older jobs)."""
+    file_hash = job.get("file_hash")
+    if not file_hash:
+        file_hash = hashlib.sha256(supabase.download_file(job["file_path"])).hexdigest()
+        supabase.set_job_file_hash(job["id"], file_hash)
+    return file_hash
+
+
+def _render_job_page(
+    job_id_value: Any, page_value: Any, dpi_value: Any
+) -> Tuple[Optional[bytes], Optional[str], Optional[func.HttpResponse]]:
+    """PNG and ETag of a page (1-based) of a PDF job at the given DPI, or an error response."""
+    job_id = _parse_uuid(str(job_id_value or ""))
+    if not job_id:
+        return None, None, _bad_request("Invalid job ID")
+
+    try:
+        page = int(str(page_value or "1").strip().lower().removesuffix(".png"))
+    except ValueError:
+        return None, None, _bad_request("Invalid page number")
+    if page < 1:
+        return None, None, _bad_request("Invalid page number")
+
+    try:
+        dpi = int(dpi_value or page_renderer.default_dpi)
+    except (ValueError, TypeError):
+        return None, None, _bad_request("'dpi' must be an integer")
+    if not page_renderer.min_dpi <= dpi <= page_renderer.max_dpi:
+        return None, None, _bad_request(f"'dpi' must be between {page_renderer.min_dpi} and {page_renderer.max_dpi}")
+
+    job = supabase.get_job(str(job_id))
+    if job is None:
+        return None, None, _not_found("Job not found")
+    file_path = job.get("file_path")
+    if not file_path:
+        return None, None, _not_found("File path not found for this job")
+    if not str(job.get("file_name") or file_path).lower().endswith(".pdf"):
+        return None, None, _bad_request("Page rendering is only available for PDF jobs")
+
     try:
-        files = getattr(req, "files", None)
-        if files:
-            file_obj = files.get("file")
-            if file_obj is not None:
-                filename = getattr(file_obj, "filename", None) or getattr(file_obj, "name", None)
-                data = file_obj.read() if hasattr(file_obj, "read") else None
-                if data is not None and filename:
-                    return data, filename
+        file_hash = _job_file_hash(job)
+        png = page_renderer.render(file_hash, lambda: supabase.download_file(file_path), page, dpi)
+    except FileNotFoundError:
+        return None, None, _not_found("File not found in storage")
+    except IndexError:
+        return None, None, _not_found("Page not found")
+
+    return png, page_renderer.etag(file_hash, page, dpi), None
+
+
+def _parse_optional_bool(value: Any) -> Optional[bool]:
+    """True/False from a JSON bool or a "true"/"false" string; None when absent."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+def _encode_job_cursor(job: Dict[str, Any]) -> str:
+    """Opaque listing cursor for the keyset position (created_at, id) of a job."""
+    raw = json.dumps([job.get("created_at") or "", job["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_job_cursor(cursor: str) -> Optional[Tuple[str, str]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+        return str(created_at), str(job_id)
     except Exception:
-        pass
+        return None
 
-    content_type = req.headers.get("content-type") or req.headers.get("Content-Type")
-    if not content_type or "multipart/form-data" not in content_type:
-        return None, None
 
-    body = req.get_body() or b""
+def _parse_uuid(value: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(value)
+    except Exception:
+        return None
 
-    # Parse multipart using standard library email parser.
-    # We construct a pseudo-message with Content-Type so email can split parts.
-    from email.parser import BytesParser
-    from email.policy import default
 
-    pseudo = (f"Content-Type: {content_type}\r\n\r\n").encode("utf-8") + body
-    msg = BytesParser(policy=default).parsebytes(pseudo)
+def _parse_multipart_form(req: func.HttpRequest) -> Optional[MultipartForm]:
+    content_type = req.headers.get("content-type") or req.headers.get("Content-Type")
+    if not content_type or "multipart/form-data" not in content_type.lower():
+        return None
+    return parse_multipart(req.get_body() or b"", content_type)
 
-    if not msg.is_multipart():
-        return None, None
 
-    for part in msg.iter_parts():
-        if part.get_content_disposition() != "form-data":
-            continue
+def _parse_multipart_file(
+    req: func.HttpRequest, form: Optional[MultipartForm] = None
+) -> Tuple[Optional[memoryview], Optional[str]]:
+    """The 'file' part of a multipart upload, as a view into the request body."""
+    if form is None:
+        form = _parse_multipart_form(req)
+    part = form.files.get("file") if form is not None else None
+    if part is None or not part.filename:
+        return None, None
+    return part.data, part.filename
 
-        params = part.get_params(header="content-disposition") or []
-        name = None
-        for k, v in params:
-            if k == "name":
-                name = v
-                break
 
-        if name != "file":
-            continue
+def _parse_image_request(req: func.HttpRequest) -> Tuple[Optional[PageImage], Dict[str, Any], Optional[func.HttpResponse]]:
+    """
+    Page image and options of an OCR request, in any of the supported transports:
+    - application/json: image_base64 (or image) and the options in the body
+    - multipart/form-data: 'file' part; options as form fields or query params
+    - application/octet-stream or image/*: the raw image as body; options as query
+      params, 'regions' also accepted as JSON in the X-Regions header
+    Instead of an image, any transport may send the page_id of a page session
+    (POST /ocr/pages), or job_id + page (1-based) + dpi to OCR a page of a PDF job
+    rendered on the server. Returns (page, options, error response).
+    """
+    content_type = (req.headers.get("content-type") or req.headers.get("Content-Type") or "").lower()
+    image_bytes: Optional[Any] = None
+    missing_image = "No image data provided"
+
+    if "multipart/form-data" in content_type:
+        form = _parse_multipart_form(req)
+        if form is None:
+            return None, {}, _bad_request("Invalid multipart body")
+        image_bytes, _ = _parse_multipart_file(req, form)
+        options: Dict[str, Any] = dict(form.fields)
+        options.update(req.params)
+        missing_image = "No image file provided"
+
+    elif "application/octet-stream" in content_type or content_type.startswith("image/"):
+        image_bytes = req.get_body()
+        options = dict(req.params)
+        regions_header = req.headers.get("x-regions") or req.headers.get("X-Regions")
+        if regions_header and "regions" not in options:
+            options["regions"] = regions_header
+
+    elif not req.get_body() and (req.params.get("page_id") or req.params.get("job_id")):
+        options = dict(req.params)
 
-        filename = part.get_filename()
-        data = part.get_payload(decode=True)
-        if not filename or data is None:
-            return None, None
+    else:
+        try:
+            body = req.get_json()
+        except Exception:
+            return None, {}, _bad_request("Invalid JSON body")
+        if not isinstance(body, dict):
+            return None, {}, _bad_request("Invalid JSON body")
+        options = dict(body)
+        for key in ("page_id", "job_id", "page", "dpi"):
+            if options.get(key) is None and req.params.get(key):
+                options[key] = req.params.get(key)
+        missing_image = "No image_base64 provided"
 
-        return data, filename
+        image_b64 = body.get("image_base64") or body.get("image")
+        if image_b64:
+            # Remove data URL prefix if present
+            if "," in image_b64:
+                image_b64 = image_b64.split(",", 1)[1]
 
-    return None, None
+            try:
+                image_bytes = base64.b64decode(image_b64)
+            except Exception:
+                return None, {}, _bad_request("Invalid base64 image data")
+
+    if not image_bytes and options.get("job_id"):
+        png, _, error = _render_job_page(options.get("job_id"), options.get("page"), options.get("dpi"))
+        if error is not None:
+            return None, {}, error
+        # Kept as a page session so repeated requests reuse the decoded raster
+        page, _ = page_sessions.add(png)
+        if page is None:
+            return None, {}, _json_response({"error": "Page rendering failed"}, status_code=500)
+        return page, options, None
+
+    if not image_bytes:
+        page_id = str(options.get("page_id") or "").strip()
+        if not page_id:
+            return None, {}, _bad_request(missing_image)
+        page = page_sessions.get(page_id)
+        if page is None:
+            return None, {}, _not_found("Unknown page_id; upload the page again via POST /ocr/pages")
+        return page, options, None
+
+    return PageImage(image_bytes), options, None
 
 
 @app.route(route="health", methods=["GET", "OPTIONS"])
 def health(req: func.HttpRequest) -> func.HttpResponse:
     if req.method == "OPTIONS":
         return _cors_preflight()
-    return _json_response({"status": "healthy", "version": "2.7.0"})
+    return _json_response(
+        {
+            "status": "healthy",
+            "version": "2.7.0",
+            "ocr_cache": ocr_cache.stats(),
+            "http_pool": http_pool.stats(),
+            "azure_di_polling": azure_di_poll_scheduler.stats(),
+            "word_index": word_index_cache.stats(),
+            "tesseract_pool": tesseract_pool.stats(),
+            "page_sessions": page_sessions.stats(),
+            "page_renderer": page_renderer.stats(),
+        }
+    )
 
 
 @app.route(route="jobs", methods=["GET", "POST", "OPTIONS"])
@@ -143,6 +359,9 @@ def jobs_handler(req: func.HttpRequest) -> func.HttpResponse:
         if not file_bytes or not file_name:
             return _bad_request("No file provided")
 
+        # The file name comes from the client: keep only its last component so the
+        # storage key stays inside this job's folder
+        file_name = _safe_file_name(file_name)
         job_id = uuid.uuid4()
         file_path = f"uploads/{job_id}/{file_name}"
 
@@ -154,6 +373,7 @@ def jobs_handler(req: func.HttpRequest) -> func.HttpResponse:
             "mode": mode,
             "file_path": file_path,
             "file_name": file_name,
+            "file_hash": hashlib.sha256(file_bytes).hexdigest(),
             "template": template,
             "status": "PENDING",
             "error_message": None,
@@ -193,12 +413,35 @@ def jobs_handler(req: func.HttpRequest) -> func.HttpResponse:
     except Exception:
         offset = 0
 
-    jobs = supabase.list_jobs(status=status, mode=mode, limit=limit, offset=offset)
-    return _json_response({"jobs": jobs, "count": len(jobs)})
+    # Keyset pagination: `cursor` is the next_cursor of the previous page
+    after = None
+    cursor = (req.params.get("cursor") or "").strip()
+    if cursor:
+        after = _decode_job_cursor(cursor)
+        if after is None:
+            return _bad_request("Invalid cursor")
+
+    if limit <= 0:
+        return _json_response({"jobs": [], "count": 0, "next_cursor": None})
+
+    # One extra row tells whether another page follows
+    jobs = supabase.list_jobs(status=status, mode=mode, limit=limit + 1, offset=offset, after=after)
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = _encode_job_cursor(jobs[-1])
+    return _json_response({"jobs": jobs, "count": len(jobs), "next_cursor": next_cursor})
 
 
 @app.route(route="jobs/{jobId}", methods=["GET", "OPTIONS"])
 def get_job(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Job with its results.
+    Query: fields (comma-separated top-level fields; "results.<key>" keeps only those keys
+    of the results), include_results (true | false | completed: only once the job is
+    COMPLETED; default true). The ETag changes with the job and its results, so polls
+    with If-None-Match get 304 until something changes.
+    """
     if req.method == "OPTIONS":
         return _cors_preflight()
     job_id_str = req.route_params.get("jobId")
@@ -209,15 +452,52 @@ def get_job(req: func.HttpRequest) -> func.HttpResponse:
     if not job_id:
         return _bad_request("Invalid job ID")
 
+    include_results = (req.params.get("include_results") or "true").strip().lower()
+    if include_results not in ("true", "false", "completed"):
+        return _bad_request("include_results must be true, false or completed")
+    fields = [f.strip() for f in (req.params.get("fields") or "").split(",") if f.strip()]
+    result_fields = [f[len("results."):] for f in fields if f.startswith("results.")]
+    job_fields = [f for f in fields if not f.startswith("results.")]
+    if result_fields and "results" not in job_fields:
+        job_fields.append("results")
+
     job = supabase.get_job(str(job_id))
     if job is None:
         return _not_found("Job not found")
 
-    results = supabase.get_results(str(job_id))
+    wants_results = (
+        include_results == "true"
+        or (include_results == "completed" and str(job.get("status", "")).upper() == "COMPLETED")
+    ) and (not job_fields or "results" in job_fields)
+
+    # The version is read before the results: a concurrent update can then only pair
+    # new results with an old ETag (refetched on the next poll), never the reverse.
+    results_version = supabase.get_results_version(str(job_id)) if wants_results else None
+    etag_source = json.dumps(
+        [job, results_version, include_results, job_fields, result_fields], sort_keys=True, default=str
+    )
+    etag = f'"{hashlib.sha1(etag_source.encode("utf-8")).hexdigest()}"'
+    cache_headers = {"Cache-Control": "no-cache"}
+    if _etag_matches(req, etag):
+        return _not_modified(etag, cache_headers)
+
+    results = supabase.get_results(str(job_id)) if wants_results else None
+    if result_fields and isinstance(results, dict):
+        results = {key: results[key] for key in result_fields if key in results}
     job_with_results = dict(job)
     job_with_results["results"] = results
+    if job_fields:
+        job_with_results = {key: job_with_results[key] for key in job_fields if key in job_with_results}
 
-    return _json_response(job_with_results)
+    headers = _cors_headers()
+    headers.update(cache_headers)
+    headers["ETag"] = etag
+    return func.HttpResponse(
+        body=json.dumps(job_with_results, ensure_ascii=False),
+        status_code=200,
+        mimetype="application/json",
+        headers=headers,
+    )
 
 
 @app.route(route="jobs/{jobId}/file", methods=["GET", "OPTIONS"])
@@ -242,8 +522,10 @@ def get_job_file(req: func.HttpRequest) -> func.HttpResponse:
     if not file_path:
         return _not_found("File path not found for this job")
 
+    # The uploaded file never changes; its content hash (recorded at upload) is the ETag
     try:
-        file_bytes = supabase.download_file(file_path)
+        etag = f'"{_job_file_hash(job)}"'
+        size = supabase.file_size(file_path)
     except FileNotFoundError:
         return _not_found("File not found in storage")
 
@@ -261,19 +543,125 @@ def get_job_file(req: func.HttpRequest) -> func.HttpResponse:
     elif file_name.lower().endswith(".webp"):
         content_type = "image/webp"
 
+    cache_headers = {"Cache-Control": "private, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if _etag_matches(req, etag):
+        return _not_modified(etag, cache_headers)
+
+    headers = _cors_headers()
+    headers.update(cache_headers)
+    headers["ETag"] = etag
+    headers["Content-Disposition"] = f'inline; filename="{file_name}"'
+
+    # Range requests (e.g. PDF.js loading pages lazily) read only the requested bytes.
+    # An If-Range that no longer matches falls back to the whole file.
+    byte_range = None
+    if_range = (req.headers.get("if-range") or "").strip()
+    if not if_range or if_range == etag:
+        byte_range = _parse_byte_range(req.headers.get("range") or "", size)
+    if byte_range is not None:
+        start, end = byte_range
+        if start >= size:
+            headers["Content-Range"] = f"bytes */{size}"
+            return func.HttpResponse(status_code=416, headers=headers)
+        try:
+            body = supabase.download_range(file_path, start, end - start + 1)
+        except FileNotFoundError:
+            return _not_found("File not found in storage")
+        headers["Content-Range"] = f"bytes {start}-{start + len(body) - 1}/{size}"
+        return func.HttpResponse(body=body, status_code=206, mimetype=content_type, headers=headers)
+
+    try:
+        file_bytes = supabase.download_file(file_path)
+    except FileNotFoundError:
+        return _not_found("File not found in storage")
+
+    return func.HttpResponse(body=file_bytes, status_code=200, mimetype=content_type, headers=headers)
+
+
+@app.route(route="jobs/{jobId}/images/{n}", methods=["GET", "OPTIONS"])
+def get_job_image(req: func.HttpRequest) -> func.HttpResponse:
+    """Return an image extracted from a job's document."""
+    if req.method == "OPTIONS":
+        return _cors_preflight()
+
+    job_id = _parse_uuid(req.route_params.get("jobId") or "")
+    if not job_id:
+        return _bad_request("Invalid job ID")
+
+    try:
+        n = int(req.route_params.get("n") or "")
+    except ValueError:
+        return _bad_request("Invalid image number")
+    if n < 0:
+        return _bad_request("Invalid image number")
+
+    try:
+        image_bytes = supabase.download_file(_job_image_path(str(job_id), n))
+    except FileNotFoundError:
+        return _not_found("Image not found")
+
+    # Extracted images never change once written, so clients may cache them indefinitely.
+    etag = f'"{hashlib.sha1(image_bytes).hexdigest()}"'
+    cache_headers = {"Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(req, etag):
+        return _not_modified(etag, cache_headers)
+
+    headers = _cors_headers()
+    headers.update(cache_headers)
+    headers["ETag"] = etag
     return func.HttpResponse(
-        body=file_bytes,
+        body=image_bytes,
         status_code=200,
-        headers={
-            "Content-Type": content_type,
-            "Content-Disposition": f'inline; filename="{file_name}"',
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        },
+        mimetype=image_media_type(image_bytes, default="application/octet-stream"),
+        headers=headers,
     )
 
 
+@app.route(route="jobs/{jobId}/pages/{n}", methods=["GET", "OPTIONS"])
+def get_job_page(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Render page n (1-based; "3" or "3.png") of a PDF job as PNG.
+    Query: dpi (optional, default PAGE_RENDER_DEFAULT_DPI, at most PAGE_RENDER_MAX_DPI).
+    """
+    if req.method == "OPTIONS":
+        return _cors_preflight()
+
+    job_id = req.route_params.get("jobId")
+    page = req.route_params.get("n")
+    dpi = req.params.get("dpi")
+
+    # The uploaded file never changes, so a page's ETag depends only on (file, page, dpi)
+    # and a conditional request can be answered without rendering.
+    cache_headers = {"Cache-Control": "private, max-age=31536000, immutable"}
+    job = supabase.get_job(str(_parse_uuid(job_id or "") or ""))
+    if job is not None and job.get("file_hash") and req.headers.get("if-none-match"):
+        try:
+            etag = page_renderer.etag(
+                job["file_hash"],
+                int(str(page).lower().removesuffix(".png")),
+                int(dpi or page_renderer.default_dpi),
+            )
+        except ValueError:
+            etag = None
+        if etag and _etag_matches(req, etag):
+            return _not_modified(etag, cache_headers)
+
+    try:
+        png, etag, error = _render_job_page(job_id, page, dpi)
+    except Exception as ex:
+        logger.exception("Error rendering job page")
+        return _json_response({"error": str(ex)}, status_code=500)
+    if error is not None:
+        return error
+    if _etag_matches(req, etag):
+        return _not_modified(etag, cache_headers)
+
+    headers = _cors_headers()
+    headers.update(cache_headers)
+    headers["ETag"] = etag
+    return func.HttpResponse(body=png, status_code=200, mimetype="image/png", headers=headers)
+
+
 @app.route(route="jobs/{jobId}/results", methods=["PUT", "OPTIONS"])
 def update_job_results(req: func.HttpRequest) -> func.HttpResponse:
     if req.method == "OPTIONS":
@@ -317,12 +705,21 @@ def ocr_roi_handler(req: func.HttpRequest) -> func.HttpResponse:
     - height: Height of ROI
     - use_claude: (optional) "true" to use Claude Vision (legacy)
     - prefer_method: (optional) "auto", "azure", "claude", "tesseract"
+    - page_layout: (optional) "true" to answer from one analysis of the whole image
+      (Azure DI layout / Tesseract word index)
+    - include_cropped_image: (optional) "false" to omit the base64 crop from the response
     
     Or JSON body with:
     - image_base64: Base64 encoded image
     - x, y, width, height: ROI coordinates
     - use_claude: (optional) boolean (legacy)
     - prefer_method: (optional) string
+    - page_layout: (optional) boolean
+    - include_cropped_image: (optional) boolean, default true
+
+    Or the raw image as an application/octet-stream / image/* body with the options
+    as query params. In any form, page_id (see POST /ocr/pages), or job_id + page + dpi
+    for a server-rendered page of a PDF job, can replace the image.
     
     OCR priority (when prefer_method="auto"):
     1. Azure Document Intelligence
@@ -333,84 +730,33 @@ def ocr_roi_handler(req: func.HttpRequest) -> func.HttpResponse:
         return _cors_preflight()
 
     try:
-        image_bytes: Optional[bytes] = None
-        x = y = width = height = 0
-        use_claude = False
-        prefer_method = "auto"
-
-        content_type = req.headers.get("content-type", "").lower()
-
-        if "multipart/form-data" in content_type:
-            # Parse multipart form
-            file_bytes, file_name = _parse_multipart_file(req)
-            if not file_bytes:
-                return _bad_request("No image file provided")
-            image_bytes = file_bytes
-
-            # Get ROI params from form fields or query params
-            try:
-                x = int(req.params.get("x") or req.form.get("x") or 0)
-                y = int(req.params.get("y") or req.form.get("y") or 0)
-                width = int(req.params.get("width") or req.form.get("width") or 0)
-                height = int(req.params.get("height") or req.form.get("height") or 0)
-            except (ValueError, TypeError):
-                return _bad_request("Invalid ROI coordinates. Must be integers.")
-
-            use_claude_str = (req.params.get("use_claude") or req.form.get("use_claude") or "").lower()
-            use_claude = use_claude_str in ("true", "1", "yes")
-            
-            prefer_method = (req.params.get("prefer_method") or req.form.get("prefer_method") or "auto").lower()
-
-        elif "application/json" in content_type:
-            # Parse JSON body
-            try:
-                body = req.get_json()
-            except Exception:
-                return _bad_request("Invalid JSON body")
-
-            image_b64 = body.get("image_base64") or body.get("image")
-            if not image_b64:
-                return _bad_request("No image_base64 provided in JSON body")
-
-            # Remove data URL prefix if present
-            if "," in image_b64:
-                image_b64 = image_b64.split(",", 1)[1]
-
-            try:
-                import base64
-                image_bytes = base64.b64decode(image_b64)
-            except Exception:
-                return _bad_request("Invalid base64 image data")
+        page, options, error = _parse_image_request(req)
+        if error is not None:
+            return error
 
-            try:
-                x = int(body.get("x", 0))
-                y = int(body.get("y", 0))
-                width = int(body.get("width", 0))
-                height = int(body.get("height", 0))
-            except (ValueError, TypeError):
-                return _bad_request("Invalid ROI coordinates. Must be integers.")
-
-            use_claude = body.get("use_claude", False) is True
-            prefer_method = body.get("prefer_method", "auto")
-
-        else:
-            return _bad_request("Content-Type must be multipart/form-data or application/json")
-
-        if not image_bytes:
-            return _bad_request("No image data provided")
+        try:
+            x = int(options.get("x") or 0)
+            y = int(options.get("y") or 0)
+            width = int(options.get("width") or 0)
+            height = int(options.get("height") or 0)
+        except (ValueError, TypeError):
+            return _bad_request("Invalid ROI coordinates. Must be integers.")
 
         if width <= 0 or height <= 0:
             return _bad_request("ROI width and height must be positive integers")
 
         # Perform OCR on ROI with fallback chain
         result = ocr_service.ocr_region(
-            image_bytes=image_bytes,
+            image_bytes=page.image_bytes,
             x=x,
             y=y,
             width=width,
             height=height,
-            use_claude=use_claude,
-            prefer_method=prefer_method,
+            use_claude=_parse_optional_bool(options.get("use_claude")) is True,
+            prefer_method=str(options.get("prefer_method") or "auto").lower(),
+            page_layout=_parse_optional_bool(options.get("page_layout")),
+            include_cropped_image=_parse_optional_bool(options.get("include_cropped_image")) is not False,
+            image=page.image,
         )
 
         if result.get("error"):
@@ -432,40 +778,51 @@ def ocr_roi_batch_handler(req: func.HttpRequest) -> func.HttpResponse:
     - image_base64: Base64 encoded image
     - regions: Array of {x, y, width, height, name?}
     - use_claude: (optional) boolean
+    - prefer_method: (optional) "auto", "azure", "claude", "tesseract"
+    - page_layout: (optional) boolean; analyze the whole image once (Azure DI layout /
+      Tesseract word index) and answer every region from it
+    - include_cropped_image: (optional) boolean, default true; false omits the base64
+      crops from the results
+
+    Or the image as binary: a multipart/form-data 'file' part (options as form fields
+    or query params), or an application/octet-stream / image/* body with the options
+    as query params and 'regions' as JSON in the query or the X-Regions header.
+    In any form, page_id (see POST /ocr/pages), or job_id + page + dpi for a
+    server-rendered page of a PDF job, can replace the image.
+
+    The image is decoded once and regions are OCR'd concurrently; results are
+    returned in request order.
     """
     if req.method == "OPTIONS":
         return _cors_preflight()
 
     try:
-        try:
-            body = req.get_json()
-        except Exception:
-            return _bad_request("Invalid JSON body")
-
-        image_b64 = body.get("image_base64") or body.get("image")
-        if not image_b64:
-            return _bad_request("No image_base64 provided")
+        page, options, error = _parse_image_request(req)
+        if error is not None:
+            return error
 
-        # Remove data URL prefix if present
-        if "," in image_b64:
-            image_b64 = image_b64.split(",", 1)[1]
-
-        try:
-            import base64
-            image_bytes = base64.b64decode(image_b64)
-        except Exception:
-            return _bad_request("Invalid base64 image data")
-
-        regions = body.get("regions", [])
+        regions = options.get("regions", [])
+        if isinstance(regions, str):
+            try:
+                regions = json.loads(regions)
+            except ValueError:
+                return _bad_request("'regions' must be a JSON array")
         if not isinstance(regions, list) or len(regions) == 0:
             return _bad_request("'regions' must be a non-empty array")
 
-        use_claude = body.get("use_claude", False) is True
+        use_claude = _parse_optional_bool(options.get("use_claude")) is True
+        prefer_method = str(options.get("prefer_method") or "auto").lower()
+        if prefer_method not in ("auto", "azure", "claude", "tesseract"):
+            prefer_method = "auto"
 
         results = ocr_service.ocr_multiple_regions(
-            image_bytes=image_bytes,
+            image_bytes=page.image_bytes,
             regions=regions,
             use_claude=use_claude,
+            prefer_method=prefer_method,
+            page_layout=_parse_optional_bool(options.get("page_layout")),
+            include_cropped_image=_parse_optional_bool(options.get("include_cropped_image")) is not False,
+            image=page.image,
         )
 
         return _json_response({"results": results, "count": len(results)})
@@ -475,6 +832,55 @@ def ocr_roi_batch_handler(req: func.HttpRequest) -> func.HttpResponse:
         return _json_response({"error": str(ex)}, status_code=500)
 
 
+@app.route(route="ocr/pages", methods=["POST", "OPTIONS"])
+def ocr_pages_handler(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Start a page session: upload a page image once and get a page_id (its SHA-256) to
+    pass to /ocr/roi, /ocr/roi/batch and /ocr/detect-regions instead of the image.
+    Accepts the same transports as those endpoints (JSON image_base64, multipart
+    'file', or a raw application/octet-stream / image/* body).
+
+    Sessions live in a bounded LRU (PAGE_SESSION_MAX_PAGES, PAGE_SESSION_MAX_MB);
+    an evicted page_id answers 404 and the page must be uploaded again.
+    """
+    if req.method == "OPTIONS":
+        return _cors_preflight()
+
+    try:
+        upload, _, error = _parse_image_request(req)
+        if error is not None:
+            return error
+
+        page, created = page_sessions.add(upload.image_bytes)
+        if page is None:
+            return _bad_request("Invalid image data")
+
+        width, height = page.image.size
+        return _json_response(
+            {
+                "page_id": page.page_id,
+                "image_size": {"width": width, "height": height},
+                "created": created,
+            },
+            status_code=201 if created else 200,
+        )
+
+    except Exception as ex:
+        logger.exception("Error in OCR pages handler")
+        return _json_response({"error": str(ex)}, status_code=500)
+
+
+@app.route(route="ocr/pages/{pageId}", methods=["DELETE", "OPTIONS"])
+def ocr_page_delete_handler(req: func.HttpRequest) -> func.HttpResponse:
+    if req.method == "OPTIONS":
+        return _cors_preflight()
+
+    page_id = req.route_params.get("pageId") or ""
+    if not page_sessions.remove(page_id):
+        return _not_found("Unknown page_id")
+    return _json_response({"page_id": page_id, "deleted": True})
+
+
 @app.route(route="ocr/full", methods=["POST", "OPTIONS"])
 def ocr_full_handler(req: func.HttpRequest) -> func.HttpResponse:
     """
@@ -546,6 +952,7 @@ def ocr_full_handler(req: func.HttpRequest) -> func.HttpResponse:
             width=img_width,
             height=img_height,
             use_claude=use_claude,
+            include_cropped_image=False,
         )
 
         # Don't include full cropped image in response (it's the same as input)
@@ -571,6 +978,70 @@ def ocr_detect_regions_handler(req: func.HttpRequest) -> func.HttpResponse:
     JSON body:
     - image_base64: Base64 encoded image
     - detect_visual: (optional) boolean, default True - also detect visual regions
+    - max_pixels: (optional) integer pixel budget for visual detection; larger images are
+      downscaled for detection and boxes are mapped back to full-resolution coordinates
+
+    Or the image as binary: a multipart/form-data 'file' part (options as form fields
+    or query params), or an application/octet-stream / image/* body with the options
+    as query params. In any form, page_id (see POST /ocr/pages), or job_id + page + dpi
+    for a server-rendered page of a PDF job, can replace the image; detection results
+    are then kept with the page session.
+    """
+    if req.method == "OPTIONS":
+        return _cors_preflight()
+
+    try:
+        page, options, error = _parse_image_request(req)
+        if error is not None:
+            return error
+
+        detect_visual = _parse_optional_bool(options.get("detect_visual")) is not False
+
+        max_pixels = options.get("max_pixels")
+        if max_pixels is not None:
+            try:
+                max_pixels = int(max_pixels)
+            except (ValueError, TypeError):
+                return _bad_request("'max_pixels' must be an integer")
+            if max_pixels < 0:
+                return _bad_request("'max_pixels' must be non-negative")
+        
+        def _detect() -> Dict[str, Any]:
+            if detect_visual:
+                # Detect both text and visual regions
+                return ocr_service.detect_all_regions(page.image_bytes, max_pixels=max_pixels)
+
+            # Only detect text regions (legacy behavior)
+            img = page.image
+            if img is None:
+                raise ValueError("Invalid image data")
+            img_width, img_height = img.size
+            regions = ocr_service.detect_text_regions(page.image_bytes, img)
+            return {
+                "regions": regions,
+                "count": len(regions),
+                "text_count": len(regions),
+                "visual_count": 0,
+                "image_size": {"width": img_width, "height": img_height}
+            }
+
+        result = page.artifact(("detect-regions", detect_visual, max_pixels), _detect)
+
+        return _json_response(result)
+
+    except Exception as ex:
+        logger.exception("Error in OCR detect regions handler")
+        return _json_response({"error": str(ex)}, status_code=500)
+
+
+@app.route(route="ocr/template-fields", methods=["POST", "OPTIONS"])
+def ocr_template_fields_handler(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Locate template fields (label + value boxes) on a page image.
+    
+    JSON body:
+    - image_base64: Base64 encoded image
+    - template_type: (optional) template key; detected from the page text if omitted
     """
     if req.method == "OPTIONS":
         return _cors_preflight()
@@ -595,39 +1066,40 @@ def ocr_detect_regions_handler(req: func.HttpRequest) -> func.HttpResponse:
         except Exception:
             return _bad_request("Invalid base64 image data")
 
-        detect_visual = body.get("detect_visual", True)
-        
-        if detect_visual:
-            # Detect both text and visual regions
-            result = ocr_service.detect_all_regions(image_bytes)
-        else:
-            # Only detect text regions (legacy behavior)
-            from PIL import Image
-            import io
-            img = Image.open(io.BytesIO(image_bytes))
-            img_width, img_height = img.size
-            regions = ocr_service.detect_text_regions(image_bytes)
-            result = {
-                "regions": regions,
-                "count": len(regions),
-                "text_count": len(regions),
-                "visual_count": 0,
-                "image_size": {"width": img_width, "height": img_height}
-            }
+        result = ocr_service.locate_template_fields(image_bytes, body.get("template_type") or None)
+        if result.get("error"):
+            return _json_response(result, status_code=400)
 
         return _json_response(result)
 
     except Exception as ex:
-        logger.exception("Error in OCR detect regions handler")
+        logger.exception("Error in OCR template fields handler")
         return _json_response({"error": str(ex)}, status_code=500)
 
 
+def _defer_claimed_job(queue_name: str, job_id: str) -> None:
+    """
+    Handle a message for a job that could not be claimed. A job another worker holds is
+    checked again once its lease expires, so it is reclaimed if that worker died;
+    finished jobs are skipped.
+    """
+    job = supabase.get_job(job_id) or {}
+    expiry = supabase.get_job_lease_expiry(job_id)
+    if str(job.get("status", "")).upper() != "PROCESSING" or expiry is None:
+        logger.info("Job %s is %s. Skipping message.", job_id, job.get("status"))
+        return
+    delay = max(1, int(math.ceil(expiry - time.time())) + 1)
+    queue_service.enqueue(queue_name, {"job_id": job_id}, visibility_timeout=delay)
+    logger.info("Job %s is being processed by another worker. Checking again in %ss.", job_id, delay)
+
+
 @app.function_name(name="ProcessDocumentJob")
 @app.queue_trigger(arg_name="msg", queue_name="document-jobs", connection="Storage")
 def process_document_job(msg: func.QueueMessage) -> None:
     raw = msg.get_body().decode("utf-8")
 
     job_id: Optional[str] = None
+    claim_id: Optional[str] = None
 
     try:
         payload = json.loads(raw)
@@ -635,18 +1107,26 @@ def process_document_job(msg: func.QueueMessage) -> None:
         if not job_id:
             raise ValueError("Invalid message format")
 
-        supabase.update_job_status(job_id, "PROCESSING")
-
         job = supabase.get_job(job_id)
         if job is None:
             logger.warning("Job %s not found in SupabaseService. Skipping message.", job_id)
             return
 
+        # Claim the job under a lease; a redelivered or duplicate message finds it claimed
+        claim_id = supabase.claim_job(job_id, JOB_LEASE_SECONDS)
+        if claim_id is None:
+            _defer_claimed_job("document-jobs", job_id)
+            return
+
         file_bytes = supabase.download_file(job["file_path"])
         file_name = job.get("file_name") or "document.pdf"
         
         # Extract text and images from document
-        extraction_result = ocr_service.extract_text_with_images(file_bytes, file_name)
+        extraction_result = ocr_service.extract_text_with_images(
+            file_bytes,
+            file_name,
+            store_image=_job_image_store(job_id),
+        )
         extracted_text = extraction_result.get("text", "")
         extracted_images = extraction_result.get("images_extracted", [])
 
@@ -672,12 +1152,13 @@ def process_document_job(msg: func.QueueMessage) -> None:
             unmasked["_ocr_method"] = extraction_result.get("ocr_method", "unknown")
 
         supabase.upsert_results(job_id, unmasked)
-        supabase.update_job_status(job_id, "COMPLETED")
+        if not supabase.transition_job_status(job_id, "PROCESSING", "COMPLETED", claim_id=claim_id):
+            logger.warning("Job %s was reclaimed after its lease expired; result not marked COMPLETED.", job_id)
 
     except Exception as ex:
         logger.exception("Error processing document job")
-        if job_id:
-            supabase.update_job_status(job_id, "FAILED", str(ex))
+        if job_id and claim_id:
+            supabase.transition_job_status(job_id, "PROCESSING", "FAILED", str(ex), claim_id=claim_id)
 
 
 @app.function_name(name="ProcessDesignJob")
@@ -686,6 +1167,7 @@ def process_design_job(msg: func.QueueMessage) -> None:
     raw = msg.get_body().decode("utf-8")
 
     job_id: Optional[str] = None
+    claim_id: Optional[str] = None
 
     try:
         payload = json.loads(raw)
@@ -693,20 +1175,25 @@ def process_design_job(msg: func.QueueMessage) -> None:
         if not job_id:
             raise ValueError("Invalid message format")
 
-        supabase.update_job_status(job_id, "PROCESSING")
-
         job = supabase.get_job(job_id)
         if job is None:
             logger.warning("Job %s not found in SupabaseService. Skipping message.", job_id)
             return
 
+        # Claim the job under a lease; a redelivered or duplicate message finds it claimed
+        claim_id = supabase.claim_job(job_id, JOB_LEASE_SECONDS)
+        if claim_id is None:
+            _defer_claimed_job("design-jobs", job_id)
+            return
+
         image_bytes = supabase.download_file(job["file_path"])
         analysis = ai_service.analyze_design_image(image_bytes, job.get("file_name") or "image.png")
 
         supabase.upsert_results(job_id, analysis)
-        supabase.update_job_status(job_id, "COMPLETED")
+        if not supabase.transition_job_status(job_id, "PROCESSING", "COMPLETED", claim_id=claim_id):
+            logger.warning("Job %s was reclaimed after its lease expired; result not marked COMPLETED.", job_id)
 
     except Exception as ex:
         logger.exception("Error processing design job")
-        if job_id:
-            supabase.update_job_status(job_id, "FAILED", str(ex))
+        if job_id and claim_id:
+            supabase.transition_job_status(job_id, "PROCESSING", "FAILED", str(ex), claim_id=claim_id)
@@ -5,8 +5,7 @@ import re
 import time
 from typing import Any, Dict, Optional
 
-import requests
-
+from .http_pool import http_pool
 from .template_definitions import detect_template_type, get_template_definition
 from .template_extractor import (
     build_comprehensive_extraction_prompt,
@@ -83,7 +82,7 @@ class AiService:
 
         last_error: Optional[str] = None
         for attempt in range(6):
-            resp = requests.post(
+            resp = http_pool.post(
                 "https://api.anthropic.com/v1/messages",
                 headers=headers,
                 json=payload,
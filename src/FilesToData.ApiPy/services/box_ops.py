@@ -0,0 +1,74 @@
+"""
+Vectorized bounding-box operations for region detection.
+Boxes are (x, y, width, height) rows of an (N, 4) array; overlaps are computed with
+NumPy broadcasting instead of pairwise Python loops.
+"""
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+def as_boxes(boxes: Iterable[Sequence[float]]) -> np.ndarray:
+    """(N, 4) float array of (x, y, width, height) rows."""
+    arr = np.asarray(list(boxes) if not isinstance(boxes, np.ndarray) else boxes, dtype=np.float64)
+    return arr.reshape(-1, 4)
+
+
+def _intersections(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) intersection areas."""
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    return iw * ih
+
+
+def pairwise_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) Intersection over Union; 0 where the union is empty."""
+    inter = _intersections(a, b)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def containment(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) fraction of each box of `b` covered by each box of `a`."""
+    inter = _intersections(a, b)
+    area_b = np.broadcast_to((b[:, 2] * b[:, 3])[None, :], inter.shape)
+    return np.divide(inter, area_b, out=np.zeros_like(inter), where=area_b > 0)
+
+
+def nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    thresholds,
+    tiebreak: Optional[np.ndarray] = None,
+) -> List[int]:
+    """
+    Score-ordered non-maximum suppression.
+
+    Boxes are visited by descending score (then descending `tiebreak`, then input
+    order); a box is kept unless its IoU with an already kept box exceeds its own
+    threshold. `thresholds` is a scalar or one value per box. Returns kept indices
+    in visiting order.
+    """
+    n = len(boxes)
+    if n == 0:
+        return []
+    thresholds = np.broadcast_to(np.asarray(thresholds, dtype=np.float64), (n,))
+    keys = [np.arange(n)]
+    if tiebreak is not None:
+        keys.append(-np.asarray(tiebreak, dtype=np.float64))
+    keys.append(-np.asarray(scores, dtype=np.float64))
+    order = np.lexsort(keys)
+
+    suppressed = np.zeros(n, dtype=bool)
+    keep: List[int] = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(int(i))
+        iou = pairwise_iou(boxes[i:i + 1], boxes)[0]
+        suppressed |= iou > thresholds
+    return keep
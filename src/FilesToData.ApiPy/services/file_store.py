@@ -0,0 +1,125 @@
+"""
+File byte storage backends (uploads and extracted images).
+FilesystemFileStore writes under a local directory (atomic replace, nothing kept in
+memory); BlobFileStore writes to an Azure Storage / Azurite blob container.
+Both raise FileNotFoundError for missing files, like the in-memory store, and can read
+a byte range without loading the whole file.
+"""
+import os
+import threading
+import uuid
+from typing import List
+
+from .queue_service import QueueService
+
+try:
+    from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+    from azure.storage.blob import BlobServiceClient
+    HAS_BLOB = True
+except ImportError:
+    HAS_BLOB = False
+
+
+def check_file_path(file_path: str) -> List[str]:
+    """Segments of a relative "/"-separated storage key; ValueError for absolute or ".." keys."""
+    segments = file_path.split("/")
+    if (
+        not file_path
+        or os.path.isabs(file_path)
+        or "\\" in file_path
+        or any(segment in ("", ".", "..") for segment in segments)
+    ):
+        raise ValueError(f"Invalid file path: {file_path}")
+    return segments
+
+
+class FilesystemFileStore:
+    def __init__(self, root: str) -> None:
+        self._root = os.path.abspath(root)
+        os.makedirs(self._root, exist_ok=True)
+
+    def _path(self, file_path: str) -> str:
+        segments = check_file_path(file_path)
+        path = os.path.realpath(os.path.join(self._root, *segments))
+        # Keys look like "<area>/<job id>/<name...>"; the file must stay in its job's folder
+        folder = os.path.realpath(os.path.join(self._root, *segments[:2]))
+        if len(segments) < 3 or os.path.commonpath([folder, path]) != folder or path == folder:
+            raise ValueError(f"Invalid file path: {file_path}")
+        return path
+
+    def upload_file(self, file_path: str, content: bytes) -> None:
+        path = self._path(file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def download_file(self, file_path: str) -> bytes:
+        try:
+            with open(self._path(file_path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {file_path}")
+
+    def file_size(self, file_path: str) -> int:
+        try:
+            return os.path.getsize(self._path(file_path))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {file_path}")
+
+    def download_range(self, file_path: str, start: int, length: int) -> bytes:
+        try:
+            with open(self._path(file_path), "rb") as f:
+                f.seek(start)
+                return f.read(length)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {file_path}")
+
+
+class BlobFileStore:
+    def __init__(self, connection_string: str, container: str) -> None:
+        if not HAS_BLOB:
+            raise RuntimeError("FILE_STORAGE_BACKEND=blob requires the azure-storage-blob package")
+        service = BlobServiceClient.from_connection_string(QueueService._normalize_connection_string(connection_string))
+        self._container = service.get_container_client(container)
+        self._lock = threading.Lock()
+        self._container_ready = False
+
+    def _ensure_container(self) -> None:
+        if self._container_ready:
+            return
+        with self._lock:
+            if not self._container_ready:
+                try:
+                    self._container.create_container()
+                except ResourceExistsError:
+                    pass
+                self._container_ready = True
+
+    def upload_file(self, file_path: str, content: bytes) -> None:
+        check_file_path(file_path)
+        self._ensure_container()
+        self._container.upload_blob(name=file_path, data=bytes(content), overwrite=True)
+
+    def download_file(self, file_path: str) -> bytes:
+        try:
+            return self._container.download_blob(file_path).readall()
+        except ResourceNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {file_path}")
+
+    def file_size(self, file_path: str) -> int:
+        try:
+            return self._container.get_blob_client(file_path).get_blob_properties().size
+        except ResourceNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {file_path}")
+
+    def download_range(self, file_path: str, start: int, length: int) -> bytes:
+        try:
+            return self._container.download_blob(file_path, offset=start, length=length).readall()
+        except ResourceNotFoundError:
+            raise FileNotFoundError(f"File not found in storage: {file_path}")
@@ -0,0 +1,104 @@
+"""
+Shared HTTP connection pool.
+One requests.Session with a keep-alive connection pool per host, shared by every
+outbound call (Azure Document Intelligence, Claude), so requests reuse TCP/TLS
+connections instead of handshaking on every call. urllib3 pools are thread-safe,
+so the session can be used concurrently from worker threads.
+"""
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+class HttpPool:
+    def __init__(self) -> None:
+        # Peak concurrent requests: each concurrently running Functions invocation
+        # (PYTHON_THREADPOOL_THREAD_COUNT) may fan out to CLAUDE_MAX_WORKERS threads.
+        claude_workers = max(1, _env_int("CLAUDE_MAX_WORKERS", 2))
+        functions_concurrency = max(1, _env_int("PYTHON_THREADPOOL_THREAD_COUNT", 1))
+        default_size = max(10, claude_workers * functions_concurrency, _env_int("AZURE_DI_FIGURE_WORKERS", 6))
+        self._pool_maxsize = max(1, _env_int("HTTP_POOL_MAXSIZE", default_size))
+        self._pool_hosts = max(1, _env_int("HTTP_POOL_HOSTS", 8))
+
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._adapter: Optional[HTTPAdapter] = None
+        self._requests = 0
+        self._errors = 0
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    adapter = HTTPAdapter(
+                        pool_connections=self._pool_hosts,
+                        pool_maxsize=self._pool_maxsize,
+                        pool_block=False,
+                    )
+                    session = requests.Session()
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._adapter = adapter
+                    self._session = session
+        return self._session
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        with self._lock:
+            self._requests += 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection reuse per host: urllib3 counts requests and newly opened connections."""
+        hosts: Dict[str, Dict[str, Any]] = {}
+        total_connections = 0
+        adapter = self._adapter
+        if adapter is not None:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                opened = getattr(pool, "num_connections", 0)
+                served = getattr(pool, "num_requests", 0)
+                total_connections += opened
+                hosts[host] = {
+                    "requests": served,
+                    "connections_opened": opened,
+                    "idle_connections": sum(1 for c in list(pool.pool.queue) if c is not None) if pool.pool is not None else 0,
+                    "reuse_ratio": round(1 - opened / served, 4) if served else 0.0,
+                }
+
+        with self._lock:
+            return {
+                "pool_maxsize": self._pool_maxsize,
+                "requests": self._requests,
+                "errors": self._errors,
+                "connections_opened": total_connections,
+                "hosts": hosts,
+            }
+
+
+http_pool = HttpPool()
@@ -0,0 +1,117 @@
+"""
+Shared preprocessing for visual region detection.
+PreparedImage decodes nothing itself: it wraps a BGR array and lazily computes, once
+per image, the grayscale and saturation planes the detectors share, and refines
+boxes to their content on crops of the shared grayscale plane.
+"""
+from functools import cached_property
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+KERNEL_3 = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+KERNEL_5 = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+KERNEL_7 = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
+
+
+def edge_mask(img: np.ndarray) -> np.ndarray:
+    """Dilated Canny edges of a BGR or grayscale array (the refinement content mask)."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    return cv2.dilate(cv2.Canny(blurred, 30, 120), KERNEL_3, iterations=1) > 0
+
+
+def snap_box_to_content(img: np.ndarray, x0: int, y0: int, x1: int, y1: int, depth: int) -> Tuple[int, int, int, int]:
+    """
+    Refine the box [x0, x1) x [y0, y1) of a full-resolution image by looking for edge
+    content only in strips `depth` pixels deep along each side, so the work is
+    proportional to the box perimeter rather than its area. Sides without content in
+    their strip keep their position. Returns (x, y, w, h) with the same padding as
+    PreparedImage.refine_bbox.
+    """
+    img_height, img_width = img.shape[:2]
+    context = 4  # Blur/Canny support around each strip
+
+    def strip(sx0: int, sy0: int, sx1: int, sy1: int) -> np.ndarray:
+        cx0, cy0 = max(0, sx0 - context), max(0, sy0 - context)
+        cx1, cy1 = min(img_width, sx1 + context), min(img_height, sy1 + context)
+        mask = edge_mask(img[cy0:cy1, cx0:cx1])
+        return mask[sy0 - cy0:sy1 - cy0, sx0 - cx0:sx1 - cx0]
+
+    w, h = x1 - x0, y1 - y0
+    if w < 10 or h < 10:
+        return x0, y0, w, h
+    pad = max(3, int(min(w, h) * 0.02))
+
+    cols = strip(x0, y0, min(x1, x0 + depth), y1).any(axis=0)
+    left = x0 + int(np.argmax(cols)) - pad if cols.any() else x0
+    start = max(x0, x1 - depth)
+    cols = strip(start, y0, x1, y1).any(axis=0)
+    right = start + len(cols) - 1 - int(np.argmax(cols[::-1])) + pad if cols.any() else x1
+    rows = strip(x0, y0, x1, min(y1, y0 + depth)).any(axis=1)
+    top = y0 + int(np.argmax(rows)) - pad if rows.any() else y0
+    start = max(y0, y1 - depth)
+    rows = strip(x0, start, x1, y1).any(axis=1)
+    bottom = start + len(rows) - 1 - int(np.argmax(rows[::-1])) + pad if rows.any() else y1
+
+    left, top = max(0, left), max(0, top)
+    right, bottom = min(img_width, right), min(img_height, bottom)
+    if right - left < w * 0.15 or bottom - top < h * 0.15:
+        return x0, y0, w, h
+    return left, top, right - left, bottom - top
+
+
+class PreparedImage:
+    """Per-image arrays shared by the detectors of OcrService.detect_visual_regions."""
+
+    def __init__(self, img: np.ndarray) -> None:
+        self.img = img
+        self.height, self.width = img.shape[:2]
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def saturation(self) -> np.ndarray:
+        return cv2.cvtColor(self.img, cv2.COLOR_BGR2HSV)[:, :, 1]
+
+    def refine_bbox(self, x: int, y: int, w: int, h: int) -> Tuple[int, int, int, int]:
+        """Shrink a box to the foreground content inside it (edges, else dark pixels), with padding."""
+        img_width, img_height = self.width, self.height
+        x = max(0, min(int(x), img_width - 1))
+        y = max(0, min(int(y), img_height - 1))
+        w = max(1, min(int(w), img_width - x))
+        h = max(1, min(int(h), img_height - y))
+
+        if w < 10 or h < 10:
+            return x, y, w, h
+
+        # The masks are computed on the crop itself (the crop edge acts as the image
+        # border), which is what the detectors' boxes are tuned for. countNonZero and
+        # boundingRect avoid materializing pixel coordinates.
+        roi_blur = cv2.GaussianBlur(self.gray[y:y + h, x:x + w], (3, 3), 0)
+        mask = cv2.dilate(cv2.Canny(roi_blur, 30, 120), KERNEL_3, iterations=1)
+        min_pixels = max(20, int(w * h * 0.0008))
+        if cv2.countNonZero(mask) < min_pixels:
+            _, mask = cv2.threshold(255 - roi_blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, KERNEL_3, iterations=1)
+            if cv2.countNonZero(mask) < min_pixels:
+                return x, y, w, h
+
+        bx, by, bw, bh = cv2.boundingRect(mask)
+
+        pad = max(3, int(min(w, h) * 0.02))
+        rx1 = max(0, x + bx - pad)
+        ry1 = max(0, y + by - pad)
+        rx2 = min(img_width, x + bx + bw - 1 + pad)
+        ry2 = min(img_height, y + by + bh - 1 + pad)
+
+        rw = max(1, rx2 - rx1)
+        rh = max(1, ry2 - ry1)
+
+        if rw < w * 0.15 or rh < h * 0.15:
+            return x, y, w, h
+
+        return rx1, ry1, rw, rh
@@ -0,0 +1,29 @@
+"""
+Job status lifecycle shared by the job stores: PENDING -> PROCESSING -> COMPLETED | FAILED.
+Stores change status with a compare-and-set against the expected current status, so two
+workers handed the same queue message cannot both claim the job. A claim is a lease: a
+PROCESSING job whose lease expired (its worker died) can be claimed again.
+"""
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+JOB_STATUS_TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    "PENDING": ("PROCESSING", "FAILED"),
+    "PROCESSING": ("COMPLETED", "FAILED"),
+}
+
+
+def check_transition(from_status: Union[str, Iterable[str]], to_status: str) -> Tuple[str, ...]:
+    """Upper-cased expected statuses; ValueError unless each of them may move to `to_status`."""
+    expected = (from_status,) if isinstance(from_status, str) else tuple(from_status)
+    expected = tuple(status.upper() for status in expected)
+    for status in expected:
+        if to_status.upper() not in JOB_STATUS_TRANSITIONS.get(status, ()):
+            raise ValueError(f"Invalid job status transition: {status} -> {to_status.upper()}")
+    return expected
+
+
+def claimable(status: Any, lease_expiry: Optional[float]) -> bool:
+    """Whether a job may be claimed: PENDING, or PROCESSING without a live lease."""
+    status = str(status or "").upper()
+    return status == "PENDING" or (status == "PROCESSING" and (lease_expiry is None or lease_expiry <= time.time()))
@@ -0,0 +1,113 @@
+"""
+multipart/form-data parsing without copying the upload.
+Parts are located by scanning the request body for the boundary; file contents are
+returned as memoryview slices of the body and only the (small) part headers and text
+fields are decoded, so a parsed upload costs no more memory than the body itself.
+"""
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import unquote
+
+_PARAM = re.compile(r';\s*([^\s=;]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class FilePart(NamedTuple):
+    filename: str
+    content_type: str
+    data: memoryview
+
+
+class MultipartForm:
+    """Text fields and file parts of a multipart/form-data body (first occurrence of each name)."""
+
+    def __init__(self) -> None:
+        self.fields: Dict[str, str] = {}
+        self.files: Dict[str, FilePart] = {}
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.fields.get(name, default)
+
+
+def _header_params(value: str) -> Tuple[str, Dict[str, str]]:
+    """Split 'main; key=value; key="quoted"' into ('main', {key: value})."""
+    main, _, rest = value.partition(";")
+    params: Dict[str, str] = {}
+    for key, raw in _PARAM.findall(";" + rest):
+        raw = raw.strip()
+        if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+            raw = re.sub(r"\\(.)", r"\1", raw[1:-1])
+        params.setdefault(key.lower(), raw)
+    return main.strip().lower(), params
+
+
+def boundary_of(content_type: str) -> Optional[bytes]:
+    main, params = _header_params(content_type or "")
+    boundary = params.get("boundary")
+    if main != "multipart/form-data" or not boundary:
+        return None
+    return boundary.encode("latin-1")
+
+
+def parse_multipart(body: bytes, content_type: str) -> Optional[MultipartForm]:
+    """
+    Parse a multipart/form-data body. Returns None if the content type has no boundary
+    or the body contains no boundary; parsing stops at the first malformed part.
+    """
+    boundary = boundary_of(content_type)
+    if boundary is None:
+        return None
+
+    delimiter = b"--" + boundary
+    pos = body.find(delimiter)
+    if pos < 0:
+        return None
+
+    view = memoryview(body)
+    form = MultipartForm()
+    while True:
+        after = pos + len(delimiter)
+        if body[after:after + 2] == b"--":
+            break  # Closing delimiter
+        line_end = body.find(b"\r\n", after)
+        if line_end < 0:
+            break
+        headers_end = body.find(b"\r\n\r\n", line_end)
+        if headers_end < 0:
+            break
+        content_start = headers_end + 4
+        content_end = body.find(b"\r\n" + delimiter, content_start)
+        if content_end < 0:
+            break
+
+        headers: Dict[str, str] = {}
+        for line in body[line_end + 2:headers_end].decode("utf-8", "replace").split("\r\n"):
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        disposition, params = _header_params(headers.get("content-disposition", ""))
+        name = params.get("name")
+        if disposition == "form-data" and name is not None:
+            filename = params.get("filename")
+            if "filename*" in params:
+                # RFC 5987: charset'lang'percent-encoded
+                charset, _, encoded = params["filename*"].partition("'")
+                encoded = encoded.partition("'")[2]
+                try:
+                    filename = unquote(encoded, encoding=charset or "utf-8", errors="replace")
+                except LookupError:
+                    # Unknown charset: keep the plain filename, else assume UTF-8
+                    filename = filename if filename is not None else unquote(encoded, errors="replace")
+            if filename is not None:
+                if name not in form.files:
+                    form.files[name] = FilePart(
+                        filename=filename,
+                        content_type=headers.get("content-type", "application/octet-stream"),
+                        data=view[content_start:content_end],
+                    )
+            elif name not in form.fields:
+                form.fields[name] = body[content_start:content_end].decode("utf-8", "replace")
+
+        pos = content_end + 2
+
+    return form
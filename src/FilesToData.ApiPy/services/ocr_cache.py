@@ -0,0 +1,198 @@
+"""
+Content-addressed OCR result cache.
+Results are keyed by a hash of the image bytes, the OCR method and its options
+(language, model, ...). A bounded in-memory LRU tier is always used; an optional
+on-disk tier (OCR_CACHE_DIR) survives restarts and is shared between processes,
+with size-based eviction of the least recently used entries. Callers always get their
+own copy of a result, so mutating it never changes the cached entry.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class OcrCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._enabled = (os.getenv("OCR_CACHE_ENABLED", "true").strip().lower() or "true") not in ("0", "false", "no")
+        self._max_entries = int((os.getenv("OCR_CACHE_MAX_ENTRIES", "512").strip() or "512"))
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+
+        self._disk_dir = os.getenv("OCR_CACHE_DIR", "").strip() or None
+        self._disk_max_bytes = int(float(os.getenv("OCR_CACHE_DISK_MAX_MB", "256").strip() or "256") * 1024 * 1024)
+        self._disk_bytes: Optional[int] = None
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(image_bytes: bytes, method: str, options: Optional[Dict[str, Any]] = None) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        opts = json.dumps(options or {}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{digest}|{method}|{opts}".encode("utf-8")).hexdigest()
+
+    # Memory tier
+    def _memory_get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._memory:
+                return None
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+    def _memory_set(self, key: str, value: Any) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+
+    # Disk tier
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self._disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str) -> Any:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path, None)  # Refresh recency for eviction
+            return value
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self._disk_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    continue
+        return total
+
+    def _disk_evict(self) -> None:
+        entries = []
+        for root, _, files in os.walk(self._disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        target = int(self._disk_max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        self._disk_bytes = total
+
+    def _disk_set(self, key: str, value: Any) -> None:
+        path = self._disk_path(key)
+        try:
+            data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (TypeError, ValueError, OSError):
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._disk_usage()
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self._disk_max_bytes:
+                self._disk_evict()
+
+    # Public API
+    def get(self, key: str) -> Any:
+        if not self._enabled:
+            return None
+
+        value = self._memory_get(key)
+        if value is not None:
+            with self._lock:
+                self._hits += 1
+            return copy.deepcopy(value)
+
+        if self._disk_dir:
+            value = self._disk_get(key)
+            if value is not None:
+                self._memory_set(key, value)
+                with self._lock:
+                    self._hits += 1
+                    self._disk_hits += 1
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        if not self._enabled or value is None:
+            return
+        self._memory_set(key, value)
+        if self._disk_dir:
+            self._disk_set(key, value)
+
+    def get_or_compute(
+        self,
+        image_bytes: bytes,
+        method: str,
+        compute: Callable[[], Any],
+        options: Optional[Dict[str, Any]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Return the cached result for (image, method, options) or compute and store it."""
+        if not self._enabled:
+            return compute()
+
+        key = self.make_key(image_bytes, method, options)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = compute()
+        if cacheable is None or cacheable(value):
+            self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self._enabled,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self._max_entries,
+                "disk_dir": self._disk_dir,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self._disk_max_bytes if self._disk_dir else None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._hits = self._disk_hits = self._misses = 0
+
+
+ocr_cache = OcrCache()
@@ -1,19 +1,22 @@
 import os
 import base64
 import io
+import math
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
-from typing import Optional, List, Dict, Any, Tuple
-from pypdf import PdfReader
-import requests
+from typing import Optional, List, Dict, Any, Tuple, Callable
 
-# Optional imports for image OCR
-try:
-    import fitz  # PyMuPDF
-    HAS_PYMUPDF = True
-except ImportError:
-    HAS_PYMUPDF = False
+from .http_pool import http_pool
+from .ocr_cache import ocr_cache
+from .pdf_pages import HAS_PYMUPDF, analyze_pdf, estimate_pdf_page_count, format_text_layer
+from .poll_scheduler import azure_di_poll_scheduler
+from .spatial_index import WordIndex, tesseract_words, word_index_cache
+from .tesseract_pool import tesseract_pool
+from .template_definitions import detect_template_type, get_template_definition
 
+# Optional imports for image OCR
 try:
     import pytesseract
     from PIL import Image
@@ -25,11 +28,41 @@ except ImportError:
 try:
     import cv2
     import numpy as np
+    from .box_ops import as_boxes, containment, nms, pairwise_iou
+    from .image_prep import KERNEL_3, KERNEL_5, KERNEL_7, PreparedImage, snap_box_to_content
     HAS_OPENCV = True
 except ImportError:
     HAS_OPENCV = False
 
 
+# Persists extracted image bytes and returns an API-relative URL for them.
+ImageStore = Callable[[bytes], str]
+
+
+def image_media_type(image_bytes: bytes, default: str = "image/png") -> str:
+    """Detect the media type of encoded image bytes from their magic number."""
+    if image_bytes[:2] == b'\xff\xd8':
+        return "image/jpeg"
+    if image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    if image_bytes[:4] == b'GIF8':
+        return "image/gif"
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return "image/webp"
+    if image_bytes[:2] == b'BM':
+        return "image/bmp"
+    if image_bytes[:4] in (b'II*\x00', b'MM\x00*'):
+        return "image/tiff"
+    return default
+
+
+def _is_cacheable_ocr(value: Any) -> bool:
+    """OCR results are cached unless they carry an error/placeholder marker."""
+    if isinstance(value, dict):
+        value = value.get("text", "")
+    return isinstance(value, str) and not value.startswith("[")
+
+
 class OcrService:
     def __init__(self) -> None:
         # Optional: set Tesseract path if needed (Windows)
@@ -44,8 +77,25 @@ class OcrService:
         self._azure_di_locale = os.getenv("AZURE_DI_LOCALE", "es").strip() or "es"
         self._azure_di_timeout_seconds = int((os.getenv("AZURE_DI_TIMEOUT_SECONDS", "120").strip() or "120"))
         self._azure_di_poll_timeout_seconds = int((os.getenv("AZURE_DI_POLL_TIMEOUT_SECONDS", "180").strip() or "180"))
-        self._azure_di_poll_interval_seconds = float((os.getenv("AZURE_DI_POLL_INTERVAL_SECONDS", "2.5").strip() or "2.5"))
         self._azure_di_output_content_format = os.getenv("AZURE_DI_OUTPUT_CONTENT_FORMAT", "text").strip() or "text"
+        self._azure_di_figure_workers = int((os.getenv("AZURE_DI_FIGURE_WORKERS", "6").strip() or "6"))
+        # ROI OCR: analyze the whole page once and answer regions from its layout
+        self._roi_page_layout_default = (os.getenv("OCR_ROI_PAGE_LAYOUT", "false").strip().lower() or "false") in ("1", "true", "yes")
+
+        # Page-parallel PDF extraction (process pool, one PDF open per worker)
+        self._pdf_extract_workers = int((os.getenv("PDF_EXTRACT_WORKERS", "").strip() or str(min(4, os.cpu_count() or 1))))
+        self._pdf_parallel_min_pages = int((os.getenv("PDF_PARALLEL_MIN_PAGES", "4").strip() or "4"))
+
+        # Region detection: pixel budget for the OpenCV passes (0 = full resolution)
+        self._detect_max_pixels = int((os.getenv("OCR_DETECT_MAX_PIXELS", "0").strip() or "0"))
+
+        # Batch ROI OCR: worker threads and per-backend concurrency limits
+        # (Tesseract is bounded by the engine pool, see TESSERACT_POOL_SIZE)
+        self._ocr_batch_workers = int((os.getenv("OCR_BATCH_WORKERS", "8").strip() or "8"))
+        self._backend_limits = {
+            "azure": threading.BoundedSemaphore(int((os.getenv("OCR_AZURE_MAX_CONCURRENCY", "4").strip() or "4"))),
+            "claude": threading.BoundedSemaphore(int((os.getenv("OCR_CLAUDE_MAX_CONCURRENCY", "2").strip() or "2"))),
+        }
 
     def _azure_di_is_enabled(self) -> bool:
         return bool(self._azure_di_endpoint and self._azure_di_key)
@@ -57,7 +107,7 @@ class OcrService:
             "api-key": self._azure_di_key,
         }
 
-    def _azure_di_analyze_document(self, file_bytes: bytes) -> Dict[str, Any]:
+    def _azure_di_analyze_document(self, file_bytes: bytes, page_count_hint: Optional[int] = None) -> Dict[str, Any]:
         endpoint = self._azure_di_endpoint.rstrip("/")
         url = f"{endpoint}/documentintelligence/documentModels/{self._azure_di_model}:analyze"
 
@@ -74,7 +124,7 @@ class OcrService:
 
         payload = {"base64Source": base64.b64encode(file_bytes).decode("utf-8")}
 
-        resp = requests.post(
+        resp = http_pool.post(
             url,
             headers=self._azure_di_headers(),
             json=payload,
@@ -88,49 +138,61 @@ class OcrService:
         if not op_location:
             raise RuntimeError("Azure DI analyze missing Operation-Location header")
 
-        body = self._azure_di_poll_result(op_location)
+        body = self._azure_di_poll_result(op_location, page_count_hint=page_count_hint)
         if isinstance(body, dict):
             body["operationLocation"] = op_location
         return body
 
-    def _azure_di_poll_result(self, operation_location: str) -> Dict[str, Any]:
+    def _azure_di_poll_result(self, operation_location: str, page_count_hint: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Poll an analyze operation until it finishes.
+        Delays come from the adaptive scheduler: a short (or learned) first wait, then
+        exponential backoff capped at AZURE_DI_POLL_INTERVAL_SECONDS.
+        """
         started = time.time()
         last_status: Optional[str] = None
-        last_body: Optional[Dict[str, Any]] = None
+        retry_after = 0.0
+        op = azure_di_poll_scheduler.start(page_count_hint)
 
         while True:
-            if time.time() - started > float(self._azure_di_poll_timeout_seconds):
+            wait_seconds = op.next_delay(retry_after)
+            remaining = float(self._azure_di_poll_timeout_seconds) - (time.time() - started)
+            if remaining <= 0:
+                op.finish("timeout")
                 raise TimeoutError(f"Azure DI poll timed out (last_status={last_status})")
+            time.sleep(min(wait_seconds, remaining))
 
-            resp = requests.get(
-                operation_location,
-                headers=self._azure_di_headers(),
-                timeout=self._azure_di_timeout_seconds,
-            )
+            try:
+                resp = http_pool.get(
+                    operation_location,
+                    headers=self._azure_di_headers(),
+                    timeout=self._azure_di_timeout_seconds,
+                )
+            except Exception:
+                op.finish("error")
+                raise
 
             if resp.status_code // 100 != 2:
+                op.finish("error")
                 raise RuntimeError(f"Azure DI poll failed: {resp.status_code} - {resp.text}")
 
             body = resp.json() if resp.content else {}
-            last_body = body
             status = (body.get("status") or "").lower()
             last_status = status
 
             if status == "succeeded":
+                pages = (body.get("analyzeResult") or {}).get("pages") or []
+                op.finish("succeeded", len(pages) or None)
                 return body
             if status == "failed":
+                op.finish("failed")
                 raise RuntimeError(f"Azure DI analyze failed: {body}")
 
-            retry_after = resp.headers.get("retry-after") or resp.headers.get("Retry-After")
+            retry_after_header = resp.headers.get("retry-after") or resp.headers.get("Retry-After")
             try:
-                wait_seconds = float(retry_after) if retry_after else 0.0
+                retry_after = float(retry_after_header) if retry_after_header else 0.0
             except Exception:
-                wait_seconds = 0.0
-
-            if wait_seconds <= 0:
-                wait_seconds = self._azure_di_poll_interval_seconds
-
-            time.sleep(wait_seconds)
+                retry_after = 0.0
 
     def _azure_di_build_figure_url(self, operation_location: str, figure_id: str) -> str:
         split = urlsplit(operation_location)
@@ -145,7 +207,7 @@ class OcrService:
 
     def _azure_di_fetch_figure_bytes(self, operation_location: str, figure_id: str) -> bytes:
         url = self._azure_di_build_figure_url(operation_location, figure_id)
-        resp = requests.get(
+        resp = http_pool.get(
             url,
             headers=self._azure_di_headers(),
             timeout=self._azure_di_timeout_seconds,
@@ -154,8 +216,30 @@ class OcrService:
             raise RuntimeError(f"Azure DI figure fetch failed: {resp.status_code} - {resp.text}")
         return resp.content
 
-    def _azure_di_extract_text_and_figures(self, file_bytes: bytes) -> Dict[str, Any]:
-        analysis = self._azure_di_analyze_document(file_bytes)
+    def _azure_di_fetch_figures(self, operation_location: str, figure_ids: List[str]) -> Dict[str, bytes]:
+        """
+        Download figures concurrently over the shared keep-alive connection pool.
+        A failed download yields b"" for that figure without affecting the others.
+        """
+        if not figure_ids:
+            return {}
+
+        workers = max(1, min(self._azure_di_figure_workers, len(figure_ids)))
+
+        def _fetch(figure_id: str) -> bytes:
+            try:
+                return self._azure_di_fetch_figure_bytes(operation_location, figure_id)
+            except Exception:
+                return b""
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fetch, figure_ids))
+
+        return dict(zip(figure_ids, results))
+
+    def _azure_di_extract_text_and_figures(self, file_bytes: bytes, store_image: Optional[ImageStore] = None) -> Dict[str, Any]:
+        # Runs before the single-pass analysis, so only a byte-scan estimate sizes the polls
+        analysis = self._azure_di_analyze_document(file_bytes, page_count_hint=estimate_pdf_page_count(file_bytes))
 
         analyze_result = analysis.get("analyzeResult") or {}
         content = analyze_result.get("content") or ""
@@ -163,19 +247,19 @@ class OcrService:
 
         op_location = analysis.get("operationLocation") or analysis.get("operation-location")
 
+        figures = [fig for fig in figures if fig.get("id")]
+        figure_bytes = self._azure_di_fetch_figures(op_location, [fig["id"] for fig in figures]) if op_location else {}
+
         extracted_images: List[Dict[str, Any]] = []
         for fig in figures:
             fig_id = fig.get("id")
-            if not fig_id:
-                continue
-
-            try:
-                fig_bytes = self._azure_di_fetch_figure_bytes(op_location, fig_id) if op_location else b""
-            except Exception:
-                fig_bytes = b""
+            fig_bytes = figure_bytes.get(fig_id) or b""
 
             data_url = None
-            if fig_bytes:
+            image_url = None
+            if fig_bytes and store_image is not None:
+                image_url = store_image(fig_bytes)
+            elif fig_bytes:
                 img_b64 = base64.b64encode(fig_bytes).decode("utf-8")
                 data_url = f"data:image/png;base64,{img_b64}"
 
@@ -190,18 +274,20 @@ class OcrService:
             if fig.get("caption") and isinstance(fig.get("caption"), dict):
                 ocr_text = (fig.get("caption") or {}).get("content") or ""
 
-            extracted_images.append(
-                {
-                    "page": page or 1,
-                    "index": len(extracted_images) + 1,
-                    "width": 0,
-                    "height": 0,
-                    "format": "png",
-                    "ocr_text": (ocr_text or "").strip(),
-                    "data_url": data_url,
-                    "azure_figure_id": fig_id,
-                }
-            )
+            image_entry = {
+                "page": page or 1,
+                "index": len(extracted_images) + 1,
+                "width": 0,
+                "height": 0,
+                "format": "png",
+                "ocr_text": (ocr_text or "").strip(),
+                "data_url": data_url,
+                "azure_figure_id": fig_id,
+            }
+            if image_url:
+                del image_entry["data_url"]
+                image_entry["image_url"] = image_url
+            extracted_images.append(image_entry)
 
         return {
             "text": content.strip(),
@@ -209,59 +295,6 @@ class OcrService:
             "ocr_method": "azure_document_intelligence",
         }
 
-    def _refine_bbox_to_content(self, gray_img, x: int, y: int, w: int, h: int, img_width: int, img_height: int) -> Tuple[int, int, int, int]:
-        if not HAS_OPENCV:
-            return x, y, w, h
-
-        x = max(0, min(int(x), img_width - 1))
-        y = max(0, min(int(y), img_height - 1))
-        w = max(1, min(int(w), img_width - x))
-        h = max(1, min(int(h), img_height - y))
-
-        roi = gray_img[y:y + h, x:x + w]
-        if roi is None or roi.size == 0:
-            return x, y, w, h
-
-        roi_h, roi_w = roi.shape[:2]
-        if roi_w < 10 or roi_h < 10:
-            return x, y, w, h
-
-        try:
-            roi_blur = cv2.GaussianBlur(roi, (3, 3), 0)
-            edges = cv2.Canny(roi_blur, 30, 120)
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            edges = cv2.dilate(edges, kernel, iterations=1)
-
-            ys, xs = np.where(edges > 0)
-            if xs.size < max(20, int(roi.size * 0.0008)):
-                inv = 255 - roi_blur
-                _, thr = cv2.threshold(inv, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                thr = cv2.morphologyEx(thr, cv2.MORPH_OPEN, kernel, iterations=1)
-                ys, xs = np.where(thr > 0)
-                if xs.size < max(20, int(roi.size * 0.0008)):
-                    return x, y, w, h
-
-            x1 = int(xs.min())
-            y1 = int(ys.min())
-            x2 = int(xs.max())
-            y2 = int(ys.max())
-
-            pad = max(3, int(min(roi_w, roi_h) * 0.02))
-            rx1 = max(0, x + x1 - pad)
-            ry1 = max(0, y + y1 - pad)
-            rx2 = min(img_width, x + x2 + pad)
-            ry2 = min(img_height, y + y2 + pad)
-
-            rw = max(1, rx2 - rx1)
-            rh = max(1, ry2 - ry1)
-
-            if rw < w * 0.15 or rh < h * 0.15:
-                return x, y, w, h
-
-            return rx1, ry1, rw, rh
-        except Exception:
-            return x, y, w, h
-
     def extract_text(self, file_bytes: bytes, file_name: str) -> str:
         ext = (os.path.splitext(file_name)[1] or "").lower().lstrip(".")
 
@@ -276,14 +309,15 @@ class OcrService:
     def _extract_from_pdf(self, pdf_bytes: bytes) -> str:
         """Extract text from PDF: text layer + OCR on embedded images."""
         parts = []
+        pages = self._analyze_pdf(pdf_bytes)
         
         # 1. Extract text layer
-        text_layer = self._try_extract_pdf_text_layer(pdf_bytes)
+        text_layer = self._try_extract_pdf_text_layer(pages)
         if text_layer:
             parts.append(text_layer)
         
         # 2. Extract and OCR images from PDF
-        image_texts = self._extract_images_from_pdf(pdf_bytes)
+        image_texts = self._extract_images_from_pdf(pages)
         if image_texts:
             parts.append("\n--- TEXTO EXTRAÍDO DE IMÁGENES (OCR) ---\n")
             parts.extend(image_texts)
@@ -293,17 +327,8 @@ class OcrService:
 
         return "[PDF contains no extractable text layer. Configure TESSERACT_PATH for OCR.]"
 
-    def _try_extract_pdf_text_layer(self, pdf_bytes: bytes) -> Optional[str]:
-        try:
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-            parts = []
-            for i, page in enumerate(reader.pages, start=1):
-                text = page.extract_text() or ""
-                parts.append(f"--- PAGE {i} ---\n{text}\n")
-            result = "\n".join(parts).strip()
-            return result or None
-        except Exception:
-            return None
+    def _try_extract_pdf_text_layer(self, pages: List[Dict[str, Any]]) -> Optional[str]:
+        return format_text_layer(pages)
 
     def _extract_from_image(self, image_bytes: bytes) -> str:
         """Extract text from image using Tesseract."""
@@ -319,95 +344,108 @@ class OcrService:
         """Run OCR on image bytes using Tesseract."""
         if not HAS_TESSERACT:
             return ""
+        return ocr_cache.get_or_compute(
+            image_bytes,
+            "tesseract",
+            lambda: self._run_tesseract(image_bytes),
+            options={"lang": "spa+eng"},
+            cacheable=_is_cacheable_ocr,
+        )
+
+    def _run_tesseract(self, image_bytes: bytes) -> str:
         try:
             image = Image.open(io.BytesIO(image_bytes))
             # Convert to RGB if necessary (handles RGBA, P mode, etc.)
             if image.mode not in ('RGB', 'L'):
                 image = image.convert('RGB')
             # Run Tesseract with Spanish + English
-            text = pytesseract.image_to_string(image, lang='spa+eng')
+            text = tesseract_pool.image_to_string(image, lang='spa+eng')
             return text.strip()
         except Exception as e:
             return f"[Tesseract OCR error: {str(e)}]"
 
-    def detect_text_regions(self, image_bytes: bytes) -> List[Dict[str, Any]]:
+    def page_word_index(self, image_bytes: bytes, image: Optional["Image.Image"] = None) -> Optional[WordIndex]:
+        """
+        Tesseract word index of a page image. Word boxes are cached by image content
+        (ocr_cache method "tesseract_words") and the built index is kept in memory, so
+        repeat queries on the same page don't run OCR again. None if Tesseract fails.
+        """
+        if not HAS_TESSERACT:
+            return None
+
+        options = {"lang": "spa+eng"}
+        key = ocr_cache.make_key(image_bytes, "tesseract_words", options)
+
+        def _build() -> Optional[WordIndex]:
+            value = ocr_cache.get(key)
+            if value is None:
+                value = self._run_tesseract_words(image_bytes, image)
+                if value is None:
+                    return None
+                ocr_cache.set(key, value)
+            return WordIndex(value["words"], width=value["width"], height=value["height"])
+
+        return word_index_cache.get_or_build(key, _build)
+
+    def _run_tesseract_words(self, image_bytes: bytes, image: Optional["Image.Image"] = None) -> Optional[Dict[str, Any]]:
+        try:
+            if image is None:
+                image = Image.open(io.BytesIO(image_bytes))
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            data = tesseract_pool.image_to_data(image, lang='spa+eng')
+            width, height = image.size
+            return {"width": width, "height": height, "words": tesseract_words(data)}
+        except Exception as e:
+            print(f"Error building word index: {e}")
+            return None
+
+    def detect_text_regions(self, image_bytes: bytes, image: Optional["Image.Image"] = None) -> List[Dict[str, Any]]:
         """
         Detect text regions in an image using Tesseract.
         Returns list of bounding boxes with text content.
+        `image` is the already decoded image, if the caller has one.
         """
         if not HAS_TESSERACT:
             return []
         
         regions = []
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode not in ('RGB', 'L'):
-                image = image.convert('RGB')
-            
-            # Get bounding box data from Tesseract
-            data = pytesseract.image_to_data(image, lang='spa+eng', output_type=pytesseract.Output.DICT)
-            
-            # Group words into blocks/paragraphs
-            n_boxes = len(data['text'])
-            current_block = None
-            blocks = {}
+            index = self.page_word_index(image_bytes, image)
+            if index is None:
+                return []
             
-            for i in range(n_boxes):
-                text = data['text'][i].strip()
-                conf = int(data['conf'][i]) if data['conf'][i] != '-1' else 0
+            # Group words into blocks (filter low confidence)
+            for block_num, words in index.blocks(min_conf=30).items():
+                bx = min(w['x'] for w in words)
+                by = min(w['y'] for w in words)
+                width = max(w['x'] + w['width'] for w in words) - bx
+                height = max(w['y'] + w['height'] for w in words) - by
                 
-                if text and conf > 30:  # Filter low confidence
-                    block_num = data['block_num'][i]
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-                    
-                    if block_num not in blocks:
-                        blocks[block_num] = {
-                            'x': x, 'y': y, 
-                            'x2': x + w, 'y2': y + h,
-                            'texts': [],
-                            'conf_sum': 0,
-                            'conf_count': 0
-                        }
-                    
-                    block = blocks[block_num]
-                    block['x'] = min(block['x'], x)
-                    block['y'] = min(block['y'], y)
-                    block['x2'] = max(block['x2'], x + w)
-                    block['y2'] = max(block['y2'], y + h)
-                    block['texts'].append(text)
-                    block['conf_sum'] += conf
-                    block['conf_count'] += 1
-            
-            # Convert blocks to regions
-            for block_num, block in blocks.items():
-                if block['texts']:
-                    width = block['x2'] - block['x']
-                    height = block['y2'] - block['y']
-                    
-                    # Skip very small regions
-                    if width < 20 or height < 10:
-                        continue
-                    
-                    # Add padding
-                    padding = 5
-                    x = max(0, block['x'] - padding)
-                    y = max(0, block['y'] - padding)
-                    w = width + padding * 2
-                    h = height + padding * 2
-                    
-                    avg_conf = block['conf_sum'] / block['conf_count'] if block['conf_count'] > 0 else 0
-                    
-                    regions.append({
-                        'id': f'region_{block_num}',
-                        'x': x,
-                        'y': y,
-                        'width': w,
-                        'height': h,
-                        'area': w * h,
-                        'text': ' '.join(block['texts']),
-                        'confidence': round(avg_conf, 1),
-                        'block_num': block_num
-                    })
+                # Skip very small regions
+                if width < 20 or height < 10:
+                    continue
+                
+                # Add padding
+                padding = 5
+                x = max(0, bx - padding)
+                y = max(0, by - padding)
+                w = width + padding * 2
+                h = height + padding * 2
+                
+                avg_conf = sum(wd['conf'] for wd in words) / len(words)
+                
+                regions.append({
+                    'id': f'region_{block_num}',
+                    'x': x,
+                    'y': y,
+                    'width': w,
+                    'height': h,
+                    'area': w * h,
+                    'text': ' '.join(wd['text'] for wd in words),
+                    'confidence': round(avg_conf, 1),
+                    'block_num': block_num
+                })
             
             # Sort by position (top to bottom, left to right)
             regions.sort(key=lambda r: (r['y'], r['x']))
@@ -417,35 +455,120 @@ class OcrService:
         
         return regions
 
-    def detect_visual_regions(self, image_bytes: bytes, min_area: int = 500) -> List[Dict[str, Any]]:
+    def locate_template_fields(self, image_bytes: bytes, template_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Locate template fields on a page image from its word index: find each field's
+        label and read the value to the right of it on the same line (or, if empty,
+        just below the label).
+        """
+        result: Dict[str, Any] = {"template_type": template_type, "fields": {}, "error": None}
+        index = self.page_word_index(image_bytes)
+        if index is None:
+            result["error"] = "Tesseract is not available" if not HAS_TESSERACT else "OCR failed"
+            return result
+
+        if not template_type:
+            template_type = detect_template_type(index.text_in(0, 0, index.width, index.height))
+            result["template_type"] = template_type
+
+        # Label of each field: the first of its patterns found on the page
+        labels: Dict[str, Dict[str, Any]] = {}
+        for section_key, section in get_template_definition(template_type).get("sections", {}).items():
+            for field_key, patterns in section.get("fields", {}).items():
+                for pattern in patterns:
+                    matches = index.find(pattern)
+                    if matches:
+                        labels[f"{section_key}.{field_key}"] = matches[0]
+                        break
+
+        for field, box in labels.items():
+            pad = max(2, box["height"] // 2)
+            right = box["x"] + box["width"] + 1
+            # The value ends where the next label on the same line starts
+            limit = min(
+                (
+                    other["x"] for other in labels.values()
+                    if other["x"] >= right and abs((other["y"] + other["height"] / 2) - (box["y"] + box["height"] / 2)) <= pad
+                ),
+                default=index.width,
+            )
+            value_box = {"x": right, "y": box["y"] - pad, "width": max(0, limit - right - 1), "height": box["height"] + pad * 2}
+            value = index.text_in(**value_box)
+            if not value:
+                value_box = {
+                    "x": max(0, box["x"] - pad),
+                    "y": box["y"] + box["height"] + 1,
+                    "width": max(box["width"] * 3, box["height"] * 10),
+                    "height": box["height"] * 2,
+                }
+                value = index.text_in(**value_box)
+            result["fields"][field] = {
+                "label": box["text"],
+                "label_box": {k: box[k] for k in ("x", "y", "width", "height")},
+                "value": value,
+                "value_box": value_box,
+            }
+
+        return result
+
+    def detect_visual_regions(
+        self,
+        image_bytes: bytes,
+        min_area: int = 500,
+        max_pixels: Optional[int] = None,
+        image: Optional["np.ndarray"] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Detect visual regions (shapes, boxes, illustrations) using multiple OpenCV methods.
         Much more robust detection that works on any type of image.
+
+        Images larger than `max_pixels` (default OCR_DETECT_MAX_PIXELS, 0 = no limit) are
+        downscaled for detection; the final regions are mapped back to full-resolution
+        coordinates and refined at full resolution. `image` is the already decoded
+        BGR array, if the caller has one.
         """
         if not HAS_OPENCV:
             return []
         
         regions = []
+        # Candidate boxes from every detector: (x, y, w, h, type, confidence, iou_threshold).
+        # Overlaps are resolved once with score-ordered NMS.
+        candidates: List[Tuple[int, int, int, int, str, float, float]] = []
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            img = image if image is not None else self._decode_bgr(image_bytes)
             if img is None:
                 return []
             
-            img_height, img_width = img.shape[:2]
+            # Multi-resolution: detect on a copy downscaled to the pixel budget.
+            # Pixel thresholds below are in full-resolution units, scaled by `scale`.
+            if max_pixels is None:
+                max_pixels = self._detect_max_pixels
+            full_height, full_width = img.shape[:2]
+            work = img
+            scale = 1.0
+            if max_pixels and full_width * full_height > max_pixels:
+                scale = math.sqrt(max_pixels / float(full_width * full_height))
+                work = cv2.resize(
+                    img,
+                    (max(1, int(full_width * scale)), max(1, int(full_height * scale))),
+                    interpolation=cv2.INTER_AREA,
+                )
+
+            # Grayscale and saturation planes are computed once and shared by the detectors;
+            # refine_bbox works on crops of the grayscale plane
+            prep = PreparedImage(work)
+            img_height, img_width = prep.height, prep.width
             img_area = img_height * img_width
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            gray = prep.gray
             
             # Adaptive min_area based on image size (0.5% of image area minimum)
-            adaptive_min_area = max(min_area, int(img_area * 0.005))
+            adaptive_min_area = max(min_area * scale * scale, int(img_area * 0.005))
             
             # METHOD 1: Multi-scale edge detection with Canny
             for canny_low, canny_high in [(30, 100), (50, 150), (100, 200)]:
                 edges = cv2.Canny(gray, canny_low, canny_high)
-                kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-                edges = cv2.dilate(edges, kernel, iterations=2)
-                edges = cv2.erode(edges, kernel, iterations=1)
+                edges = cv2.dilate(edges, KERNEL_5, iterations=2)
+                edges = cv2.erode(edges, KERNEL_5, iterations=1)
                 
                 contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
                 
@@ -455,20 +578,19 @@ class OcrService:
                         continue
                     
                     x, y, w, h = cv2.boundingRect(contour)
-                    if w < 20 or h < 20:
+                    if w < 20 * scale or h < 20 * scale:
                         continue
                     if w > img_width * 0.98 and h > img_height * 0.98:
                         continue
                     
                     # Refine bounding box to foreground content
-                    rx, ry, rw, rh = self._refine_bbox_to_content(gray, x, y, w, h, img_width, img_height)
-                    self._add_region_if_unique(regions, rx, ry, rw, rh, rw * rh, 'shape', 70.0, img_width, img_height)
+                    rx, ry, rw, rh = prep.refine_bbox(x, y, w, h)
+                    candidates.append((rx, ry, rw, rh, 'shape', 70.0, 0.4))
             
             # METHOD 2: Adaptive thresholding for varied lighting
             adaptive_thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
                                                      cv2.THRESH_BINARY_INV, 11, 2)
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            adaptive_thresh = cv2.morphologyEx(adaptive_thresh, cv2.MORPH_CLOSE, kernel, iterations=2)
+            adaptive_thresh = cv2.morphologyEx(adaptive_thresh, cv2.MORPH_CLOSE, KERNEL_3, iterations=2)
             
             contours, _ = cv2.findContours(adaptive_thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             for contour in contours:
@@ -476,17 +598,16 @@ class OcrService:
                 if area < adaptive_min_area:
                     continue
                 x, y, w, h = cv2.boundingRect(contour)
-                if w < 25 or h < 25:
+                if w < 25 * scale or h < 25 * scale:
                     continue
                 if w > img_width * 0.98 and h > img_height * 0.98:
                     continue
-                rx, ry, rw, rh = self._refine_bbox_to_content(gray, x, y, w, h, img_width, img_height)
-                self._add_region_if_unique(regions, rx, ry, rw, rh, rw * rh, 'shape', 65.0, img_width, img_height)
+                rx, ry, rw, rh = prep.refine_bbox(x, y, w, h)
+                candidates.append((rx, ry, rw, rh, 'shape', 65.0, 0.4))
             
             # METHOD 3: Otsu thresholding
             _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-            otsu = cv2.morphologyEx(otsu, cv2.MORPH_CLOSE, kernel, iterations=2)
+            otsu = cv2.morphologyEx(otsu, cv2.MORPH_CLOSE, KERNEL_5, iterations=2)
             
             contours, _ = cv2.findContours(otsu, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             for contour in contours:
@@ -494,21 +615,18 @@ class OcrService:
                 if area < adaptive_min_area:
                     continue
                 x, y, w, h = cv2.boundingRect(contour)
-                if w < 25 or h < 25:
+                if w < 25 * scale or h < 25 * scale:
                     continue
                 if w > img_width * 0.98 and h > img_height * 0.98:
                     continue
-                rx, ry, rw, rh = self._refine_bbox_to_content(gray, x, y, w, h, img_width, img_height)
-                self._add_region_if_unique(regions, rx, ry, rw, rh, rw * rh, 'illustration', 60.0, img_width, img_height)
+                rx, ry, rw, rh = prep.refine_bbox(x, y, w, h)
+                candidates.append((rx, ry, rw, rh, 'illustration', 60.0, 0.4))
             
             # METHOD 4: Color-based segmentation (for colored regions)
             if len(img.shape) == 3:
-                hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
                 # Detect saturated colors (non-grayscale areas)
-                saturation = hsv[:, :, 1]
-                _, sat_mask = cv2.threshold(saturation, 50, 255, cv2.THRESH_BINARY)
-                kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
-                sat_mask = cv2.morphologyEx(sat_mask, cv2.MORPH_CLOSE, kernel, iterations=2)
+                _, sat_mask = cv2.threshold(prep.saturation, 50, 255, cv2.THRESH_BINARY)
+                sat_mask = cv2.morphologyEx(sat_mask, cv2.MORPH_CLOSE, KERNEL_7, iterations=2)
                 
                 contours, _ = cv2.findContours(sat_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
                 for contour in contours:
@@ -516,20 +634,22 @@ class OcrService:
                     if area < adaptive_min_area * 0.3:
                         continue
                     x, y, w, h = cv2.boundingRect(contour)
-                    if w < 15 or h < 15:
+                    if w < 15 * scale or h < 15 * scale:
                         continue
                     if w > img_width * 0.98 and h > img_height * 0.98:
                         continue
-                    rx, ry, rw, rh = self._refine_bbox_to_content(gray, x, y, w, h, img_width, img_height)
-                    self._add_region_if_unique(regions, rx, ry, rw, rh, rw * rh, 'colored', 75.0, img_width, img_height)
+                    rx, ry, rw, rh = prep.refine_bbox(x, y, w, h)
+                    candidates.append((rx, ry, rw, rh, 'colored', 75.0, 0.4))
             
             # METHOD 5: Grid-based detection (divide image into quadrants/sections)
             # This ensures we always have some regions even if other methods fail
-            if len(regions) < 3:
-                grid_regions = self._create_grid_regions(img_width, img_height)
+            if len(self._suppress_regions(candidates)) < 3:
+                # Laid out at full resolution (fixed pixel margins), in work coordinates
+                grid_regions = self._create_grid_regions(full_width, full_height)
                 for gr in grid_regions:
-                    self._add_region_if_unique(regions, gr['x'], gr['y'], gr['width'], gr['height'], 
-                                               gr['area'], 'section', 35.0, img_width, img_height, iou_threshold=0.85)
+                    gx, gy = int(round(gr['x'] * scale)), int(round(gr['y'] * scale))
+                    gw, gh = int(round(gr['width'] * scale)), int(round(gr['height'] * scale))
+                    candidates.append((gx, gy, gw, gh, 'section', 35.0, 0.85))
             
             # METHOD 6: Detect rectangles/boxes specifically
             for thresh_val in [127, 200, 230]:
@@ -545,13 +665,15 @@ class OcrService:
                         area = w * h
                         if area < adaptive_min_area * 0.3:
                             continue
-                        if w < 20 or h < 20:
+                        if w < 20 * scale or h < 20 * scale:
                             continue
                         if w > img_width * 0.98 and h > img_height * 0.98:
                             continue
-                        rx, ry, rw, rh = self._refine_bbox_to_content(gray, x, y, w, h, img_width, img_height)
-                        self._add_region_if_unique(regions, rx, ry, rw, rh, rw * rh, 'box', 80.0, img_width, img_height)
+                        rx, ry, rw, rh = prep.refine_bbox(x, y, w, h)
+                        candidates.append((rx, ry, rw, rh, 'box', 80.0, 0.4))
             
+            regions = self._suppress_regions(candidates)
+
             # Classify regions by aspect ratio
             for region in regions:
                 w, h = region['width'], region['height']
@@ -572,6 +694,10 @@ class OcrService:
             
             # Limit to top 20 regions to avoid overwhelming the UI
             regions = regions[:20]
+
+            if work is not img:
+                self._rescale_regions(regions, img, img_width, img_height)
+                regions.sort(key=lambda r: (-r['area'], r['y'], r['x']))
             
         except Exception as e:
             print(f"Error detecting visual regions: {e}")
@@ -580,40 +706,69 @@ class OcrService:
         
         return regions
 
-    def _add_region_if_unique(self, regions: List[Dict], x: int, y: int, w: int, h: int, 
-                               area: float, region_type: str, confidence: float,
-                               img_width: int, img_height: int, iou_threshold: float = 0.4) -> bool:
-        """Add a region only if it doesn't significantly overlap with existing regions."""
-        # Check for duplicates
-        for existing in regions:
-            iou = self._calculate_iou(
-                (x, y, w, h),
-                (existing['x'], existing['y'], existing['width'], existing['height'])
-            )
-            if iou > iou_threshold:
-                # Keep the one with higher confidence or larger area
-                if confidence > existing['confidence'] or area > existing['area']:
-                    existing['x'] = x
-                    existing['y'] = y
-                    existing['width'] = w
-                    existing['height'] = h
-                    existing['area'] = area
-                    existing['confidence'] = confidence
-                    existing['type'] = region_type
-                return False
-        
-        regions.append({
-            'id': f'region_{len(regions)}',
-            'x': int(x),
-            'y': int(y),
-            'width': int(w),
-            'height': int(h),
-            'area': int(area),
-            'type': region_type,
-            'confidence': confidence,
-            'is_visual': True
-        })
-        return True
+    def _decode_bgr(self, image_bytes: bytes) -> Optional["np.ndarray"]:
+        # Convert bytes to numpy array
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    def _rescale_regions(self, regions: List[Dict[str, Any]], img, work_width: int, work_height: int) -> None:
+        """
+        Map regions detected on a downscaled copy back to the full-resolution image `img`.
+        Each region (except grid sections) is then refined at full resolution, looking only
+        at strips along its sides where the downscaled content edges can lie.
+        """
+        full_height, full_width = img.shape[:2]
+        sx = work_width / float(full_width)
+        sy = work_height / float(full_height)
+
+        for region in regions:
+            x0 = max(0, int(math.floor(region['x'] / sx)))
+            y0 = max(0, int(math.floor(region['y'] / sy)))
+            x1 = min(full_width, int(math.ceil((region['x'] + region['width']) / sx)))
+            y1 = min(full_height, int(math.ceil((region['y'] + region['height']) / sy)))
+            x, y, w, h = x0, y0, max(1, x1 - x0), max(1, y1 - y0)
+
+            if region['type'] != 'section':
+                # Downscaled refinement padded the content edge by `pad` work pixels
+                # (+1 for rounding); search that far, in full-resolution pixels.
+                pad = max(3, int(min(region['width'], region['height']) * 0.02))
+                depth = int(math.ceil((pad + 2) / min(sx, sy)))
+                x, y, w, h = snap_box_to_content(img, x0, y0, x1, y1, depth)
+
+            region['x'] = int(x)
+            region['y'] = int(y)
+            region['width'] = int(w)
+            region['height'] = int(h)
+            region['area'] = int(w * h)
+
+    def _suppress_regions(self, candidates: List[Tuple[int, int, int, int, str, float, float]]) -> List[Dict[str, Any]]:
+        """
+        Non-maximum suppression over candidate boxes (x, y, w, h, type, confidence, iou_threshold):
+        higher confidence wins, then larger area; a candidate is dropped when its IoU with a
+        kept box exceeds its own threshold.
+        """
+        if not candidates:
+            return []
+        boxes = as_boxes([c[:4] for c in candidates])
+        confidences = np.array([c[5] for c in candidates], dtype=np.float64)
+        thresholds = np.array([c[6] for c in candidates], dtype=np.float64)
+        keep = nms(boxes, confidences, thresholds, tiebreak=boxes[:, 2] * boxes[:, 3])
+
+        regions = []
+        for i in keep:
+            x, y, w, h, region_type, confidence, _ = candidates[i]
+            regions.append({
+                'id': f'region_{len(regions)}',
+                'x': int(x),
+                'y': int(y),
+                'width': int(w),
+                'height': int(h),
+                'area': int(w * h),
+                'type': region_type,
+                'confidence': confidence,
+                'is_visual': True
+            })
+        return regions
 
     def _create_grid_regions(self, img_width: int, img_height: int) -> List[Dict]:
         """Create grid-based regions as fallback."""
@@ -649,51 +804,66 @@ class OcrService:
         
         return regions
 
-    def detect_all_regions(self, image_bytes: bytes) -> Dict[str, Any]:
+    def detect_all_regions(self, image_bytes: bytes, max_pixels: Optional[int] = None) -> Dict[str, Any]:
         """
         Detect both text and visual regions, merge and deduplicate.
         Returns combined list with region types.
+
+        The image is decoded once; the Tesseract and OpenCV branches run concurrently
+        (both release the GIL) on the shared decoded pixels.
         """
-        text_regions = self.detect_text_regions(image_bytes)
-        visual_regions = self.detect_visual_regions(image_bytes)
+        bgr = None
+        pil_image = None
+        img_width, img_height = 0, 0
+        try:
+            if HAS_OPENCV:
+                bgr = self._decode_bgr(image_bytes)
+            if bgr is not None:
+                img_height, img_width = bgr.shape[:2]
+                if HAS_TESSERACT:
+                    pil_image = Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+            elif HAS_TESSERACT:
+                pil_image = Image.open(io.BytesIO(image_bytes))
+                pil_image.load()
+                img_width, img_height = pil_image.size
+        except Exception:
+            pass
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            text_future = executor.submit(self.detect_text_regions, image_bytes, pil_image)
+            visual_future = executor.submit(
+                self.detect_visual_regions, image_bytes, max_pixels=max_pixels, image=bgr
+            )
+            text_regions = text_future.result()
+            visual_regions = visual_future.result()
         
         # Mark text regions
         for r in text_regions:
             r['type'] = 'text'
             r['is_visual'] = False
         
-        # Combine and deduplicate
-        all_regions = []
+        # Combine and deduplicate (text regions first)
+        all_regions = list(text_regions)
         
-        # Add text regions first
-        for tr in text_regions:
-            all_regions.append(tr)
-        
-        # Add visual regions, checking for overlap with text (keep both unless nearly identical)
-        for vr in visual_regions:
-            is_duplicate = False
-            for existing in all_regions:
-                iou = self._calculate_iou(
-                    (vr['x'], vr['y'], vr['width'], vr['height']),
-                    (existing['x'], existing['y'], existing['width'], existing['height'])
-                )
+        # Add visual regions, checking for overlap with text (keep both unless nearly identical).
+        # A visual region covering more than 65% of a text block is tagged 'mixed'.
+        if visual_regions:
+            visual_boxes = as_boxes([(r['x'], r['y'], r['width'], r['height']) for r in visual_regions])
+            if text_regions:
+                text_boxes = as_boxes([(r['x'], r['y'], r['width'], r['height']) for r in text_regions])
+                duplicates_text = (pairwise_iou(visual_boxes, text_boxes) > 0.90).any(axis=1)
+                covers_text = (containment(visual_boxes, text_boxes) > 0.65).any(axis=1)
+            else:
+                duplicates_text = covers_text = np.zeros(len(visual_regions), dtype=bool)
+            visual_iou = pairwise_iou(visual_boxes, visual_boxes)
 
-                if iou > 0.90:
-                    is_duplicate = True
-                    break
-
-                ex_area = existing.get('area') or (existing.get('width', 0) * existing.get('height', 0))
-                if ex_area > 0:
-                    x1 = max(vr['x'], existing['x'])
-                    y1 = max(vr['y'], existing['y'])
-                    x2 = min(vr['x'] + vr['width'], existing['x'] + existing['width'])
-                    y2 = min(vr['y'] + vr['height'], existing['y'] + existing['height'])
-                    if x2 > x1 and y2 > y1:
-                        inter_area = (x2 - x1) * (y2 - y1)
-                        if inter_area / float(ex_area) > 0.65 and existing.get('type') == 'text':
-                            vr['type'] = 'mixed'
-            
-            if not is_duplicate:
+            kept: List[int] = []
+            for i, vr in enumerate(visual_regions):
+                if duplicates_text[i] or (kept and (visual_iou[i, kept] > 0.90).any()):
+                    continue
+                if covers_text[i]:
+                    vr['type'] = 'mixed'
+                kept.append(i)
                 all_regions.append(vr)
         
         # Sort by position (top to bottom, left to right)
@@ -703,14 +873,6 @@ class OcrService:
         for i, r in enumerate(all_regions):
             r['id'] = f'region_{i}'
         
-        # Get image dimensions
-        img_width, img_height = 0, 0
-        try:
-            img = Image.open(io.BytesIO(image_bytes))
-            img_width, img_height = img.size
-        except:
-            pass
-        
         return {
             'regions': all_regions,
             'count': len(all_regions),
@@ -719,73 +881,29 @@ class OcrService:
             'image_size': {'width': img_width, 'height': img_height}
         }
 
-    def _calculate_iou(self, box1: Tuple[int, int, int, int], box2: Tuple[int, int, int, int]) -> float:
-        """Calculate Intersection over Union for two bounding boxes (x, y, w, h)."""
-        x1, y1, w1, h1 = box1
-        x2, y2, w2, h2 = box2
-        
-        # Calculate intersection
-        xi1 = max(x1, x2)
-        yi1 = max(y1, y2)
-        xi2 = min(x1 + w1, x2 + w2)
-        yi2 = min(y1 + h1, y2 + h2)
-        
-        if xi2 <= xi1 or yi2 <= yi1:
-            return 0.0
-        
-        inter_area = (xi2 - xi1) * (yi2 - yi1)
-        
-        # Calculate union
-        box1_area = w1 * h1
-        box2_area = w2 * h2
-        union_area = box1_area + box2_area - inter_area
-        
-        if union_area == 0:
-            return 0.0
-        
-        return inter_area / union_area
-
-    def _extract_images_from_pdf(self, pdf_bytes: bytes) -> List[str]:
-        """Extract embedded images from PDF and run OCR on each."""
-        if not HAS_PYMUPDF:
-            return []
-        
+    def _extract_images_from_pdf(self, pages: List[Dict[str, Any]]) -> List[str]:
+        """Format the OCR text of embedded PDF images for the legacy text output."""
         results = []
-        try:
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            for page_num, page in enumerate(doc, start=1):
-                image_list = page.get_images(full=True)
-                for img_index, img_info in enumerate(image_list, start=1):
-                    try:
-                        xref = img_info[0]
-                        base_image = doc.extract_image(xref)
-                        if not base_image:
-                            continue
-                        
-                        image_bytes = base_image.get("image")
-                        if not image_bytes:
-                            continue
-                        
-                        # Skip very small images (likely icons/decorations)
-                        width = base_image.get("width", 0)
-                        height = base_image.get("height", 0)
-                        if width < 50 or height < 50:
-                            continue
-                        
-                        # Run OCR on the image
-                        ocr_text = self._extract_from_image(image_bytes)
-                        if ocr_text and ocr_text.strip() and not ocr_text.startswith("["):
-                            results.append(f"[Imagen página {page_num}, #{img_index} ({width}x{height})]:\n{ocr_text}")
-                    except Exception:
-                        continue
-            doc.close()
-        except Exception:
-            pass
-        
+        for page in pages:
+            for img in page.get("images", []):
+                if img.get("ocr_text"):
+                    results.append(
+                        f"[Imagen página {img['page']}, #{img['index']} ({img['width']}x{img['height']})]:\n{img['ocr_text']}"
+                    )
         return results
 
-    def extract_text_with_images(self, file_bytes: bytes, file_name: str) -> Dict[str, Any]:
-        """Extract text and return structured data including image info."""
+    def extract_text_with_images(
+        self,
+        file_bytes: bytes,
+        file_name: str,
+        store_image: Optional[ImageStore] = None,
+    ) -> Dict[str, Any]:
+        """
+        Extract text and return structured data including image info.
+
+        When `store_image` is given, extracted image bytes are handed to it and the
+        results reference them by 'image_url' instead of inlining base64 data URLs.
+        """
         ext = (os.path.splitext(file_name)[1] or "").lower().lstrip(".")
         
         result = {
@@ -797,7 +915,7 @@ class OcrService:
         if ext == "pdf":
             if self._azure_di_is_enabled():
                 try:
-                    azure_result = self._azure_di_extract_text_and_figures(file_bytes)
+                    azure_result = self._azure_di_extract_text_and_figures(file_bytes, store_image=store_image)
                     if azure_result.get("text"):
                         result["text"] = azure_result.get("text") or ""
                         result["ocr_method"] = azure_result.get("ocr_method") or "azure_document_intelligence"
@@ -805,14 +923,20 @@ class OcrService:
                 except Exception:
                     pass
 
-            if not result.get("text"):
-                text_layer = self._try_extract_pdf_text_layer(file_bytes)
+            need_text = not result.get("text")
+            need_images = not result.get("images_extracted")
+            pages = []
+            if need_text or need_images:
+                pages = self._analyze_pdf(file_bytes, text_layer=need_text, images=need_images)
+
+            if need_text:
+                text_layer = self._try_extract_pdf_text_layer(pages)
                 if text_layer:
                     result["text"] = text_layer
                     result["ocr_method"] = "pdf_text_layer"
 
-            if not result.get("images_extracted"):
-                image_results = self._extract_images_with_details(file_bytes)
+            if need_images:
+                image_results = self._extract_images_with_details(pages, store_image=store_image)
                 result["images_extracted"] = image_results
 
                 if image_results:
@@ -838,60 +962,56 @@ class OcrService:
         
         return result
 
-    def _extract_images_with_details(self, pdf_bytes: bytes) -> List[Dict[str, Any]]:
-        """Extract images from PDF with metadata."""
-        if not HAS_PYMUPDF:
-            return []
-        
-        results = []
+    def _analyze_pdf(self, pdf_bytes: bytes, text_layer: bool = True, images: bool = True) -> List[Dict[str, Any]]:
+        """Open the PDF once and build per-page records (text, image xrefs, dimensions)."""
         try:
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            for page_num, page in enumerate(doc, start=1):
-                image_list = page.get_images(full=True)
-                for img_index, img_info in enumerate(image_list, start=1):
-                    try:
-                        xref = img_info[0]
-                        base_image = doc.extract_image(xref)
-                        if not base_image:
-                            continue
-                        
-                        image_bytes = base_image.get("image")
-                        if not image_bytes:
-                            continue
-                        
-                        width = base_image.get("width", 0)
-                        height = base_image.get("height", 0)
-                        
-                        # Skip very small images
-                        if width < 50 or height < 50:
-                            continue
-                        
-                        ocr_text = ""
-                        if HAS_TESSERACT:
-                            ocr_text = self._extract_from_image(image_bytes)
-                            if ocr_text.startswith("["):
-                                ocr_text = ""  # Error message, ignore
-                        
-                        # Convert image to base64 for frontend display
-                        img_format = base_image.get("ext", "png")
-                        mime_type = f"image/{img_format}" if img_format != "unknown" else "image/png"
-                        img_base64 = base64.b64encode(image_bytes).decode("utf-8")
-                        
-                        results.append({
-                            "page": page_num,
-                            "index": img_index,
-                            "width": width,
-                            "height": height,
-                            "format": img_format,
-                            "ocr_text": ocr_text.strip() if ocr_text else "",
-                            "data_url": f"data:{mime_type};base64,{img_base64}"
-                        })
-                    except Exception:
-                        continue
-            doc.close()
+            return analyze_pdf(
+                pdf_bytes,
+                text_layer=text_layer,
+                images=images and HAS_PYMUPDF,
+                workers=self._pdf_extract_workers,
+                min_parallel_pages=self._pdf_parallel_min_pages,
+            )
         except Exception:
-            pass
-        
+            return []
+
+    def _extract_images_with_details(
+        self,
+        pages: List[Dict[str, Any]],
+        store_image: Optional[ImageStore] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Build image metadata from the page records.
+        Each unique image is stored once, as an 'image_url' from `store_image` or else
+        as a base64 data URL; repeated placements carry 'duplicate_of' with the list
+        index of the first placement instead.
+        """
+        results = []
+        first_index: Dict[int, int] = {}
+        image_urls: Dict[int, str] = {}
+        for page in pages:
+            for img in page.get("images", []):
+                entry = {
+                    "page": img["page"],
+                    "index": img["index"],
+                    "width": img["width"],
+                    "height": img["height"],
+                    "format": img["format"],
+                    "ocr_text": img["ocr_text"],
+                }
+                if img["is_duplicate"]:
+                    entry["duplicate_of"] = first_index[img["image_id"]]
+                    if img["image_id"] in image_urls:
+                        entry["image_url"] = image_urls[img["image_id"]]
+                else:
+                    first_index[img["image_id"]] = len(results)
+                    if store_image is not None:
+                        image_urls[img["image_id"]] = store_image(img["data"])
+                        entry["image_url"] = image_urls[img["image_id"]]
+                    else:
+                        img_base64 = base64.b64encode(img["data"]).decode("utf-8")
+                        entry["data_url"] = f"data:{img['mime_type']};base64,{img_base64}"
+                results.append(entry)
         return results
 
     def ocr_region(
@@ -903,6 +1023,9 @@ class OcrService:
         height: int,
         use_claude: bool = False,
         prefer_method: str = "auto",
+        page_layout: Optional[bool] = None,
+        include_cropped_image: bool = True,
+        image: Optional["Image.Image"] = None,
     ) -> Dict[str, Any]:
         """
         Extract text from a specific region (ROI) of an image.
@@ -915,11 +1038,95 @@ class OcrService:
             height: Height of the ROI
             use_claude: If True, use Claude Vision for OCR (legacy param)
             prefer_method: 'auto' (Azure DI -> Claude -> Tesseract), 'azure', 'claude', 'tesseract'
+            page_layout: Answer from a single whole-page analysis (Azure DI layout or
+                Tesseract word index, cached per image) instead of OCR'ing the crop.
+                Defaults to OCR_ROI_PAGE_LAYOUT.
+            include_cropped_image: Echo the crop as a base64 PNG data URL in 'cropped_image'
+            image: `image_bytes` already decoded (e.g. from a page session)
             
         Returns:
             Dict with 'text', 'roi', 'method', and optionally 'cropped_image' (base64)
         """
-        result: Dict[str, Any] = {
+        result = self._new_roi_result(x, y, width, height)
+        try:
+            # Open and validate image
+            if image is None:
+                image = Image.open(io.BytesIO(image_bytes))
+            cropped = self._crop_roi(image, result)
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+
+        if cropped is None:
+            return result
+        layout = self._roi_page_layout(image_bytes, image.size, use_claude, prefer_method, page_layout)
+        index = self._roi_word_index(image_bytes, image, use_claude, prefer_method, page_layout)
+        return self._ocr_cropped(
+            cropped,
+            result,
+            use_claude=use_claude,
+            prefer_method=prefer_method,
+            page_layout=layout,
+            word_index=index,
+            include_cropped_image=include_cropped_image,
+        )
+
+    def _roi_page_layout(
+        self,
+        image_bytes: bytes,
+        image_size: Tuple[int, int],
+        use_claude: bool,
+        prefer_method: str,
+        page_layout: Optional[bool],
+    ) -> Optional[Dict[str, Any]]:
+        """Whole-page Azure DI layout for ROI requests, or None to analyze each crop separately."""
+        if page_layout is None:
+            page_layout = self._roi_page_layout_default
+        if not page_layout or use_claude or prefer_method not in ("auto", "azure") or not self._azure_di_is_enabled():
+            return None
+        with self._backend_limits["azure"]:
+            layout = self._azure_di_page_layout(image_bytes, image_size)
+        if layout.get("error"):
+            # Fall back to per-crop analysis
+            return None
+        # The index lives in word_index_cache (keyed like the Tesseract one); the cached
+        # layout itself stays JSON-serializable
+        key = ocr_cache.make_key(
+            image_bytes, "azure_di_words", dict(self._azure_di_page_options(), size=list(image_size))
+        )
+        word_index = word_index_cache.get_or_build(key, lambda: WordIndex.from_azure_layout(layout, *image_size))
+        return dict(layout, word_index=word_index)
+
+    def _roi_word_index(
+        self,
+        image_bytes: bytes,
+        image: "Image.Image",
+        use_claude: bool,
+        prefer_method: str,
+        page_layout: Optional[bool],
+    ) -> Optional[Callable[[], Optional[WordIndex]]]:
+        """
+        Loader of the page's Tesseract word index for ROI requests in page-layout mode,
+        or None to OCR each crop. The index is only built if the Tesseract step runs.
+        """
+        if page_layout is None:
+            page_layout = self._roi_page_layout_default
+        if not page_layout or use_claude or prefer_method not in ("auto", "tesseract") or not HAS_TESSERACT:
+            return None
+
+        lock = threading.Lock()
+        loaded: Dict[str, Optional[WordIndex]] = {}
+
+        def _load() -> Optional[WordIndex]:
+            with lock:
+                if "index" not in loaded:
+                    loaded["index"] = self.page_word_index(image_bytes, image)
+                return loaded["index"]
+
+        return _load
+
+    def _new_roi_result(self, x: int, y: int, width: int, height: int) -> Dict[str, Any]:
+        return {
             "text": "",
             "roi": {"x": x, "y": y, "width": width, "height": height},
             "method": "none",
@@ -927,32 +1134,50 @@ class OcrService:
             "cropped_image": None,
             "tables": [],  # List of extracted tables
         }
-        
+
+    def _crop_roi(self, image: "Image.Image", result: Dict[str, Any]) -> Optional["Image.Image"]:
+        """Validate the ROI of `result` against the image and crop it; None (with 'error' set) if invalid."""
+        roi = result["roi"]
+        x, y, width, height = roi["x"], roi["y"], roi["width"], roi["height"]
+        orig_width, orig_height = image.size
+
+        # Validate ROI bounds
+        if x < 0 or y < 0:
+            result["error"] = "ROI coordinates must be non-negative"
+            return None
+
+        if x + width > orig_width or y + height > orig_height:
+            result["error"] = f"ROI exceeds image bounds ({orig_width}x{orig_height})"
+            return None
+
+        if width <= 0 or height <= 0:
+            result["error"] = "ROI width and height must be positive"
+            return None
+
+        # Crop the image to ROI
+        cropped = image.crop((x, y, x + width, y + height))
+
+        # Convert to RGB if necessary
+        if cropped.mode not in ('RGB', 'L'):
+            cropped = cropped.convert('RGB')
+        return cropped
+
+    def _ocr_cropped(
+        self,
+        cropped: "Image.Image",
+        result: Dict[str, Any],
+        use_claude: bool = False,
+        prefer_method: str = "auto",
+        page_layout: Optional[Dict[str, Any]] = None,
+        word_index: Optional[Callable[[], Optional[WordIndex]]] = None,
+        include_cropped_image: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Run the OCR fallback chain (Azure DI -> Claude -> Tesseract) on a cropped ROI.
+        With a `page_layout`, the Azure DI step selects words/tables from the page analysis;
+        with a `word_index` loader, the Tesseract step queries the page's word index.
+        """
         try:
-            # Open and validate image
-            image = Image.open(io.BytesIO(image_bytes))
-            orig_width, orig_height = image.size
-            
-            # Validate ROI bounds
-            if x < 0 or y < 0:
-                result["error"] = "ROI coordinates must be non-negative"
-                return result
-            
-            if x + width > orig_width or y + height > orig_height:
-                result["error"] = f"ROI exceeds image bounds ({orig_width}x{orig_height})"
-                return result
-            
-            if width <= 0 or height <= 0:
-                result["error"] = "ROI width and height must be positive"
-                return result
-            
-            # Crop the image to ROI
-            cropped = image.crop((x, y, x + width, y + height))
-            
-            # Convert to RGB if necessary
-            if cropped.mode not in ('RGB', 'L'):
-                cropped = cropped.convert('RGB')
-            
             # Save cropped image to bytes
             cropped_buffer = io.BytesIO()
             img_format = "PNG"
@@ -960,8 +1185,9 @@ class OcrService:
             cropped_bytes = cropped_buffer.getvalue()
             
             # Include cropped image as base64 for verification
-            cropped_b64 = base64.b64encode(cropped_bytes).decode("utf-8")
-            result["cropped_image"] = f"data:image/png;base64,{cropped_b64}"
+            if include_cropped_image:
+                cropped_b64 = base64.b64encode(cropped_bytes).decode("utf-8")
+                result["cropped_image"] = f"data:image/png;base64,{cropped_b64}"
             
             # Handle legacy use_claude parameter
             if use_claude:
@@ -975,7 +1201,11 @@ class OcrService:
                 # Try Azure Document Intelligence first
                 if self._azure_di_is_enabled():
                     try:
-                        azure_result = self._ocr_with_azure_di_full(cropped_bytes)
+                        if page_layout is not None:
+                            azure_result = self._azure_di_layout_roi(page_layout, result["roi"])
+                        else:
+                            with self._backend_limits["azure"]:
+                                azure_result = self._ocr_with_azure_di_full(cropped_bytes)
                         azure_text = azure_result.get("text", "")
                         azure_tables = azure_result.get("tables", [])
                         # If Azure produced structured tables, return them even if plain text is empty.
@@ -1002,7 +1232,8 @@ class OcrService:
                 claude_key = os.getenv("CLAUDE_API_KEY", "").strip()
                 if claude_key:
                     try:
-                        ocr_text = self._ocr_with_claude(cropped_bytes)
+                        with self._backend_limits["claude"]:
+                            ocr_text = self._ocr_with_claude(cropped_bytes)
                         if ocr_text and not ocr_text.startswith("["):
                             result["method"] = "claude_vision"
                             result["text"] = ocr_text.strip()
@@ -1015,7 +1246,12 @@ class OcrService:
                 # Try Tesseract as last resort
                 if HAS_TESSERACT:
                     try:
-                        ocr_text = self._ocr_with_tesseract(cropped_bytes)
+                        index = word_index() if word_index is not None else None
+                        if index is not None:
+                            roi = result["roi"]
+                            ocr_text = index.text_in(roi["x"], roi["y"], roi["width"], roi["height"])
+                        else:
+                            ocr_text = self._ocr_with_tesseract(cropped_bytes)
                         if ocr_text and not ocr_text.startswith("["):
                             result["method"] = "tesseract"
                             result["text"] = ocr_text.strip()
@@ -1055,10 +1291,24 @@ class OcrService:
         """Use Azure Document Intelligence for OCR on image bytes. Returns text and tables."""
         if not self._azure_di_is_enabled():
             return {"text": "[Azure DI not configured]", "tables": []}
-        
+
+        return ocr_cache.get_or_compute(
+            image_bytes,
+            "azure_di",
+            lambda: self._run_azure_di_full(image_bytes),
+            options={
+                "model": self._azure_di_model,
+                "api_version": self._azure_di_api_version,
+                "locale": self._azure_di_locale,
+                "output_content_format": self._azure_di_output_content_format,
+            },
+            cacheable=_is_cacheable_ocr,
+        )
+
+    def _run_azure_di_full(self, image_bytes: bytes) -> Dict[str, Any]:
         try:
             # Use the analyze document endpoint with the image
-            result = self._azure_di_analyze_document(image_bytes)
+            result = self._azure_di_analyze_document(image_bytes, page_count_hint=1)
             
             # Extract text content from the result
             analyze_result = result.get("analyzeResult", {})
@@ -1072,64 +1322,184 @@ class OcrService:
                     content = "\n".join(texts).strip()
             
             # Extract tables
-            tables = []
-            raw_tables = analyze_result.get("tables", [])
-            for table in raw_tables:
-                row_count = table.get("rowCount", 0)
-                col_count = table.get("columnCount", 0)
-                cells = table.get("cells", [])
-                
-                # Build a 2D array for the table
-                table_data = [[None for _ in range(col_count)] for _ in range(row_count)]
-                headers = []
-                
-                for cell in cells:
-                    row_idx = cell.get("rowIndex", 0)
-                    col_idx = cell.get("columnIndex", 0)
-                    cell_content = cell.get("content", "")
-                    kind = cell.get("kind", "content")
-                    
-                    if row_idx < row_count and col_idx < col_count:
-                        table_data[row_idx][col_idx] = cell_content
-                    
-                    # Track header cells
-                    if kind == "columnHeader" and row_idx == 0:
-                        headers.append(cell_content)
-                
-                tables.append({
-                    "rows": table_data,
-                    "headers": headers if headers else (table_data[0] if table_data else []),
-                    "rowCount": row_count,
-                    "columnCount": col_count
-                })
+            tables = [
+                self._azure_di_build_table(table.get("rowCount", 0), table.get("columnCount", 0), table.get("cells", []))
+                for table in analyze_result.get("tables", [])
+            ]
             
             return {"text": content.strip() if content else "", "tables": tables}
         except Exception as e:
             return {"text": f"[Azure DI OCR error: {str(e)}]", "tables": []}
 
+    def _azure_di_build_table(self, row_count: int, col_count: int, cells: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the {rows, headers, rowCount, columnCount} table shape from Azure DI cells."""
+        # Build a 2D array for the table
+        table_data = [[None for _ in range(col_count)] for _ in range(row_count)]
+        headers = []
+        
+        for cell in cells:
+            row_idx = cell.get("rowIndex", 0)
+            col_idx = cell.get("columnIndex", 0)
+            cell_content = cell.get("content", "")
+            kind = cell.get("kind", "content")
+            
+            if row_idx < row_count and col_idx < col_count:
+                table_data[row_idx][col_idx] = cell_content
+            
+            # Track header cells
+            if kind == "columnHeader" and row_idx == 0:
+                headers.append(cell_content)
+        
+        return {
+            "rows": table_data,
+            "headers": headers if headers else (table_data[0] if table_data else []),
+            "rowCount": row_count,
+            "columnCount": col_count
+        }
+
+    def _azure_di_page_layout(self, image_bytes: bytes, image_size: Tuple[int, int]) -> Dict[str, Any]:
+        """
+        Analyze a whole page image once and return its word/line/table polygons in image
+        pixel coordinates. Cached by image content, so every ROI on the same page is
+        answered from a single Azure DI operation.
+        """
+        if not self._azure_di_is_enabled():
+            return {"error": "Azure DI not configured"}
+
+        return ocr_cache.get_or_compute(
+            image_bytes,
+            "azure_di_page",
+            lambda: self._run_azure_di_page_layout(image_bytes, image_size),
+            options=self._azure_di_page_options(),
+            cacheable=lambda value: isinstance(value, dict) and not value.get("error"),
+        )
+
+    def _azure_di_page_options(self) -> Dict[str, Any]:
+        return {
+            "model": self._azure_di_model,
+            "api_version": self._azure_di_api_version,
+            "locale": self._azure_di_locale,
+        }
+
+    def _run_azure_di_page_layout(self, image_bytes: bytes, image_size: Tuple[int, int]) -> Dict[str, Any]:
+        try:
+            result = self._azure_di_analyze_document(image_bytes, page_count_hint=1)
+            analyze_result = result.get("analyzeResult", {})
+            pages = analyze_result.get("pages", [])
+            if not pages:
+                return {"words": [], "lines": [], "tables": []}
+            page = pages[0]
+
+            # Image inputs are reported in pixels, but scale anyway in case the service
+            # reports a different unit or resized the image.
+            img_width, img_height = image_size
+            sx = img_width / page["width"] if page.get("width") else 1.0
+            sy = img_height / page["height"] if page.get("height") else 1.0
+
+            def _box(polygon: List[float]) -> Optional[List[float]]:
+                if not polygon:
+                    return None
+                xs = [v * sx for v in polygon[0::2]]
+                ys = [v * sy for v in polygon[1::2]]
+                return [min(xs), min(ys), max(xs), max(ys)]
+
+            def _span(spans: List[Dict[str, Any]]) -> Tuple[int, int]:
+                if not spans:
+                    return 0, 0
+                start = spans[0].get("offset", 0)
+                return start, start + spans[0].get("length", 0)
+
+            words = [
+                {
+                    "content": w.get("content", ""),
+                    "box": _box(w.get("polygon", [])),
+                    "offset": (w.get("span") or {}).get("offset", 0),
+                }
+                for w in page.get("words", [])
+            ]
+            lines = []
+            for ln in page.get("lines", []):
+                start, end = _span(ln.get("spans", []))
+                lines.append({
+                    "content": ln.get("content", ""),
+                    "box": _box(ln.get("polygon", [])),
+                    "offset": start,
+                    "end": end,
+                })
+
+            tables = []
+            for table in analyze_result.get("tables", []):
+                cells = []
+                for cell in table.get("cells", []):
+                    regions = cell.get("boundingRegions") or []
+                    cells.append({
+                        "rowIndex": cell.get("rowIndex", 0),
+                        "columnIndex": cell.get("columnIndex", 0),
+                        "content": cell.get("content", ""),
+                        "kind": cell.get("kind", "content"),
+                        "box": _box(regions[0].get("polygon", [])) if regions else None,
+                    })
+                tables.append({"cells": cells})
+
+            return {"words": words, "lines": lines, "tables": tables}
+        except Exception as e:
+            return {"error": f"Azure DI page analysis error: {str(e)}"}
+
+    def _azure_di_layout_roi(self, layout: Dict[str, Any], roi: Dict[str, int]) -> Dict[str, Any]:
+        """Answer an ROI from a cached page layout: words and table cells whose center falls inside it."""
+        x0, y0 = roi["x"], roi["y"]
+        x1, y1 = x0 + roi["width"], y0 + roi["height"]
+
+        def _inside(box: Optional[List[float]]) -> bool:
+            if not box:
+                return False
+            cx = (box[0] + box[2]) / 2
+            cy = (box[1] + box[3]) / 2
+            return x0 <= cx <= x1 and y0 <= cy <= y1
+
+        # Words grouped by the line they belong to, in reading order
+        index = layout.get("word_index") or WordIndex.from_azure_layout(layout)
+        text = index.text_in(roi["x"], roi["y"], roi["width"], roi["height"])
+
+        # Tables clipped to the cells inside the ROI, re-indexed from the first kept row/column
+        tables = []
+        for table in layout.get("tables", []):
+            cells = [c for c in table.get("cells", []) if _inside(c.get("box"))]
+            if not cells:
+                continue
+            r0 = min(c["rowIndex"] for c in cells)
+            c0 = min(c["columnIndex"] for c in cells)
+            row_count = max(c["rowIndex"] for c in cells) - r0 + 1
+            col_count = max(c["columnIndex"] for c in cells) - c0 + 1
+            shifted = [
+                dict(c, rowIndex=c["rowIndex"] - r0, columnIndex=c["columnIndex"] - c0)
+                for c in cells
+            ]
+            tables.append(self._azure_di_build_table(row_count, col_count, shifted))
+
+        return {"text": text.strip(), "tables": tables}
+
     def _ocr_with_claude(self, image_bytes: bytes) -> str:
         """Use Claude Vision API for OCR on image bytes."""
-        import requests
-        
         api_key = os.getenv("CLAUDE_API_KEY", "").strip()
         if not api_key:
             return "[Claude API key not configured]"
         
         model = os.getenv("CLAUDE_MODEL", "claude-3-sonnet-20240229").strip()
-        
-        # Detect image format
+
+        return ocr_cache.get_or_compute(
+            image_bytes,
+            "claude_vision",
+            lambda: self._run_claude_ocr(image_bytes, api_key, model),
+            options={"model": model},
+            cacheable=_is_cacheable_ocr,
+        )
+
+    def _run_claude_ocr(self, image_bytes: bytes, api_key: str, model: str) -> str:
         img_b64 = base64.b64encode(image_bytes).decode("utf-8")
-        
-        # Determine media type
-        media_type = "image/png"
-        if image_bytes[:2] == b'\xff\xd8':
-            media_type = "image/jpeg"
-        elif image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
+        media_type = image_media_type(image_bytes)
+        if media_type not in ("image/jpeg", "image/png", "image/gif", "image/webp"):
             media_type = "image/png"
-        elif image_bytes[:4] == b'GIF8':
-            media_type = "image/gif"
-        elif image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
-            media_type = "image/webp"
         
         payload = {
             "model": model,
@@ -1170,7 +1540,7 @@ class OcrService:
         }
         
         try:
-            resp = requests.post(
+            resp = http_pool.post(
                 "https://api.anthropic.com/v1/messages",
                 headers=headers,
                 json=payload,
@@ -1194,32 +1564,88 @@ class OcrService:
         image_bytes: bytes,
         regions: List[Dict[str, int]],
         use_claude: bool = False,
+        prefer_method: str = "auto",
+        page_layout: Optional[bool] = None,
+        include_cropped_image: bool = True,
+        image: Optional["Image.Image"] = None,
     ) -> List[Dict[str, Any]]:
         """
         Extract text from multiple ROIs in a single image.
+
+        The image is decoded once and every region is cropped from the decoded
+        buffer; OCR calls then run concurrently (OCR_BATCH_WORKERS), each backend
+        bounded by its own concurrency limit. Results keep the request order.
         
         Args:
             image_bytes: Raw image bytes
             regions: List of dicts with 'x', 'y', 'width', 'height' keys
             use_claude: If True, use Claude Vision for OCR
+            prefer_method: 'auto', 'azure', 'claude' or 'tesseract'
+            page_layout: Analyze the whole page once and answer every region
+                from it (see ocr_region)
+            include_cropped_image: Echo each crop in 'cropped_image'
+            image: `image_bytes` already decoded (e.g. from a page session)
             
         Returns:
             List of OCR results for each region
         """
-        results = []
+        results: List[Dict[str, Any]] = []
+        crops: List[Optional["Image.Image"]] = []
+
+        decode_error: Optional[str] = None
+        if image is None:
+            try:
+                image = Image.open(io.BytesIO(image_bytes))
+                image.load()
+            except Exception as e:
+                decode_error = str(e)
+
         for i, region in enumerate(regions):
-            roi_result = self.ocr_region(
-                image_bytes,
-                x=region.get("x", 0),
-                y=region.get("y", 0),
-                width=region.get("width", 100),
-                height=region.get("height", 100),
-                use_claude=use_claude,
+            roi_result = self._new_roi_result(
+                region.get("x", 0),
+                region.get("y", 0),
+                region.get("width", 100),
+                region.get("height", 100),
             )
             roi_result["region_index"] = i
             roi_result["region_name"] = region.get("name", f"region_{i}")
+            cropped = None
+            if decode_error is not None:
+                roi_result["error"] = decode_error
+            else:
+                try:
+                    cropped = self._crop_roi(image, roi_result)
+                except Exception as e:
+                    roi_result["error"] = str(e)
             results.append(roi_result)
-        
+            crops.append(cropped)
+
+        pending = [i for i, cropped in enumerate(crops) if cropped is not None]
+        layout = None
+        word_index = None
+        if pending:
+            layout = self._roi_page_layout(image_bytes, image.size, use_claude, prefer_method, page_layout)
+            word_index = self._roi_word_index(image_bytes, image, use_claude, prefer_method, page_layout)
+
+        def _run(index: int) -> None:
+            self._ocr_cropped(
+                crops[index],
+                results[index],
+                use_claude=use_claude,
+                prefer_method=prefer_method,
+                page_layout=layout,
+                word_index=word_index,
+                include_cropped_image=include_cropped_image,
+            )
+
+        workers = max(1, min(self._ocr_batch_workers, len(pending)))
+        if workers == 1:
+            for i in pending:
+                _run(i)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_run, pending))
+
         return results
 
 
@@ -0,0 +1,124 @@
+"""
+On-demand PDF page rasterization.
+Renders single pages of a stored PDF to PNG with PyMuPDF and keeps the results in a
+byte-bounded LRU keyed by (file hash, page, dpi). A few parsed documents stay open so
+rendering another page of the same PDF does not reload it. Rendering is deterministic
+for a given PyMuPDF build, so the ETag of a page is derived from its key alone and
+conditional requests never need to render.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+PageKey = Tuple[str, int, int]
+
+
+class PageRenderer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._max_bytes = int((os.getenv("PAGE_RENDER_CACHE_MAX_MB", "256").strip() or "256")) * 1024 * 1024
+        self._max_docs = int((os.getenv("PAGE_RENDER_MAX_DOCS", "4").strip() or "4"))
+        self.default_dpi = int((os.getenv("PAGE_RENDER_DEFAULT_DPI", "150").strip() or "150"))
+        self.max_dpi = int((os.getenv("PAGE_RENDER_MAX_DPI", "300").strip() or "300"))
+        self.min_dpi = 36
+
+        self._pages: "OrderedDict[PageKey, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._building: Dict[PageKey, threading.Lock] = {}
+        # Open documents: file hash -> (fitz.Document, lock); documents are not thread-safe
+        self._docs: "OrderedDict[str, Tuple[Any, threading.Lock]]" = OrderedDict()
+
+        self._hits = 0
+        self._renders = 0
+        self._evictions = 0
+
+    @staticmethod
+    def etag(file_hash: str, page: int, dpi: int) -> str:
+        """Strong ETag of a rendered page."""
+        version = getattr(fitz, "VersionBind", "") if HAS_PYMUPDF else ""
+        return '"' + hashlib.sha1(f"{file_hash}:{page}:{dpi}:{version}".encode("utf-8")).hexdigest() + '"'
+
+    def _document(self, file_hash: str, load_pdf: Callable[[], bytes]) -> Tuple[Any, threading.Lock]:
+        with self._lock:
+            entry = self._docs.get(file_hash)
+            if entry is not None:
+                self._docs.move_to_end(file_hash)
+                return entry
+
+        doc = fitz.open(stream=load_pdf(), filetype="pdf")
+        with self._lock:
+            entry = self._docs.setdefault(file_hash, (doc, threading.Lock()))
+            self._docs.move_to_end(file_hash)
+            # Evicted documents are closed by garbage collection once no render uses them
+            while len(self._docs) > self._max_docs:
+                self._docs.popitem(last=False)
+            return entry
+
+    def render(self, file_hash: str, load_pdf: Callable[[], bytes], page: int, dpi: int) -> bytes:
+        """
+        PNG of the 1-based `page` of the PDF identified by `file_hash`; `load_pdf` returns
+        its bytes and is only called when the document is not open already.
+        Raises IndexError for a page out of range.
+        """
+        if not HAS_PYMUPDF:
+            raise RuntimeError("PyMuPDF is not available")
+
+        key = (file_hash, page, dpi)
+        with self._lock:
+            png = self._pages.get(key)
+            if png is not None:
+                self._pages.move_to_end(key)
+                self._hits += 1
+                return png
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                png = self._pages.get(key)
+                if png is not None:
+                    self._pages.move_to_end(key)
+                    self._hits += 1
+                    return png
+
+            try:
+                doc, doc_lock = self._document(file_hash, load_pdf)
+                with doc_lock:
+                    if not 1 <= page <= doc.page_count:
+                        raise IndexError(f"Page {page} out of range (1-{doc.page_count})")
+                    png = doc[page - 1].get_pixmap(dpi=dpi).tobytes("png")
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+            with self._lock:
+                self._renders += 1
+                self._pages[key] = png
+                self._bytes += len(png)
+                while len(self._pages) > 1 and self._bytes > self._max_bytes:
+                    _, evicted = self._pages.popitem(last=False)
+                    self._bytes -= len(evicted)
+                    self._evictions += 1
+            return png
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "open_documents": len(self._docs),
+                "hits": self._hits,
+                "renders": self._renders,
+                "evictions": self._evictions,
+            }
+
+
+page_renderer = PageRenderer()
@@ -0,0 +1,196 @@
+"""
+Page-image sessions for interactive OCR.
+A page image is uploaded once (POST /ocr/pages) and addressed afterwards by its content
+hash. The store keeps the raw bytes, the decoded image and per-page artifacts (e.g.
+region detection results) in a bounded LRU, so repeated ROI/detect calls on the same
+page neither re-upload nor re-decode it.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+class PageImage:
+    """A page image and what is derived from it; decoding happens on first use."""
+
+    def __init__(self, image_bytes: bytes, page_id: Optional[str] = None) -> None:
+        self.image_bytes = image_bytes
+        self._page_id = page_id
+        self._lock = threading.Lock()
+        self._decoded = False
+        self._image: Optional["Image.Image"] = None
+        self._artifacts: Dict[Hashable, Any] = {}
+        self._artifact_locks: Dict[Hashable, threading.Lock] = {}
+        self._artifact_bytes = 0
+        # Set by the owning store so artifact growth counts against its byte budget.
+        self._on_grow: Optional[Callable[["PageImage", int], None]] = None
+
+    @property
+    def page_id(self) -> str:
+        if self._page_id is None:
+            self._page_id = hashlib.sha256(self.image_bytes).hexdigest()
+        return self._page_id
+
+    @property
+    def image(self) -> Optional["Image.Image"]:
+        """The decoded image (pixels loaded), or None if the bytes are not a readable image."""
+        with self._lock:
+            if not self._decoded:
+                self._decoded = True
+                try:
+                    image = Image.open(io.BytesIO(self.image_bytes))
+                    image.load()
+                    self._image = image
+                except Exception:
+                    self._image = None
+            return self._image
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: encoded bytes, decoded pixels and cached artifacts."""
+        size = len(self.image_bytes) + self._artifact_bytes
+        if self._image is not None:
+            width, height = self._image.size
+            size += width * height * len(self._image.getbands())
+        return size
+
+    def artifact(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Value derived from this page, computed at most once per key. Errors and None
+        results are not cached, so a later call computes again.
+        """
+        with self._lock:
+            if key in self._artifacts:
+                return self._artifacts[key]
+            key_lock = self._artifact_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._artifacts:
+                    return self._artifacts[key]
+            try:
+                value = compute()
+            finally:
+                with self._lock:
+                    self._artifact_locks.pop(key, None)
+            if value is None:
+                return None
+            size = _estimate_size(value)
+            with self._lock:
+                self._artifacts[key] = value
+                self._artifact_bytes += size
+                on_grow = self._on_grow
+            if on_grow is not None:
+                on_grow(self, size)
+            return value
+
+
+def _estimate_size(value: Any) -> int:
+    """Rough in-memory size of an artifact, from its JSON encoding."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class PageSessionStore:
+    """Bounded LRU of PageImages by page id (content hash)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._max_pages = int((os.getenv("PAGE_SESSION_MAX_PAGES", "16").strip() or "16"))
+        self._max_bytes = int((os.getenv("PAGE_SESSION_MAX_MB", "512").strip() or "512")) * 1024 * 1024
+        self._pages: "OrderedDict[str, PageImage]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def add(self, image_bytes: bytes) -> Tuple[Optional[PageImage], bool]:
+        """
+        Store a page image (decoding it once) and return (page, created). An already
+        stored identical image is reused. Returns (None, False) if it is not a readable image.
+        """
+        page_id = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            existing = self._pages.get(page_id)
+            if existing is not None:
+                self._pages.move_to_end(page_id)
+                return existing, False
+
+        page = PageImage(bytes(image_bytes), page_id=page_id)
+        if page.image is None:
+            return None, False
+
+        with self._lock:
+            existing = self._pages.get(page_id)
+            if existing is not None:
+                self._pages.move_to_end(page_id)
+                return existing, False
+            self._pages[page_id] = page
+            self._sizes[page_id] = page.nbytes
+            self._bytes += self._sizes[page_id]
+            page._on_grow = self._grow
+            self._evict()
+        return page, True
+
+    def _grow(self, page: PageImage, size: int) -> None:
+        """Charge a newly cached artifact to the budget and evict if it is now exceeded."""
+        with self._lock:
+            if self._pages.get(page.page_id) is not page:
+                return
+            self._sizes[page.page_id] += size
+            self._bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds self._lock. Bytes are released as charged, not re-read from nbytes.
+        while len(self._pages) > 1 and (len(self._pages) > self._max_pages or self._bytes > self._max_bytes):
+            page_id, evicted = self._pages.popitem(last=False)
+            evicted._on_grow = None
+            self._bytes -= self._sizes.pop(page_id, 0)
+            self._evictions += 1
+
+    def get(self, page_id: str) -> Optional[PageImage]:
+        with self._lock:
+            page = self._pages.get(page_id)
+            if page is None:
+                self._misses += 1
+                return None
+            self._pages.move_to_end(page_id)
+            self._hits += 1
+            return page
+
+    def remove(self, page_id: str) -> bool:
+        with self._lock:
+            page = self._pages.pop(page_id, None)
+            if page is None:
+                return False
+            page._on_grow = None
+            self._bytes -= self._sizes.pop(page_id, 0)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "max_pages": self._max_pages,
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+page_sessions = PageSessionStore()
@@ -0,0 +1,349 @@
+"""
+Single-pass PDF document analysis.
+Opens a PDF once (pypdf for the text layer, PyMuPDF for images and geometry), walks
+every page a single time and returns per-page records that all extraction paths read
+from. Pages can be sharded across a shared, long-lived process pool (spawned, not
+forked, since the host process is multi-threaded); each task carries the PDF bytes and
+a worker keeps the last document it opened. Records are merged back in page order.
+
+Page record keys:
+    page        1-based page number
+    width       page width in points (0 if unknown)
+    height      page height in points (0 if unknown)
+    text        text layer of the page (None if not extracted)
+    text_ok     False when the text layer could not be extracted
+    image_xrefs xrefs of every image placed on the page, in placement order
+    images      embedded image placements (>= 50x50 px) with 'page', 'index', 'xref',
+                'image_id', 'is_duplicate', 'width', 'height', 'format', 'mime_type',
+                'ocr_text' and raw 'data' bytes (None on duplicate placements)
+"""
+import hashlib
+import io
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from pypdf import PdfReader
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+
+# Per-process state for pool workers: (content hash, PdfReader, fitz.Document)
+_worker_pdf: Optional[tuple] = None
+
+# Shared pool for page sharding, created on first use
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _open_pdf(pdf_bytes: bytes) -> tuple:
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+    except Exception:
+        reader = None
+
+    doc = None
+    if HAS_PYMUPDF:
+        try:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception:
+            doc = None
+
+    return pdf_bytes, reader, doc
+
+
+def _page_count(reader, doc) -> int:
+    if reader is not None:
+        try:
+            return len(reader.pages)
+        except Exception:
+            pass
+    if doc is not None:
+        return doc.page_count
+    return 0
+
+
+def _image_ocr_text(image_bytes: bytes) -> str:
+    # Imported lazily: ocr_service imports this module, and pool workers
+    # only need the OCR singleton once they actually process a page.
+    from .ocr_service import HAS_TESSERACT, ocr_service
+
+    if not HAS_TESSERACT:
+        return ""
+    text = ocr_service._extract_from_image(image_bytes)
+    if text.startswith("["):
+        return ""  # Error message, ignore
+    return text.strip()
+
+
+def _analyze_page(reader, doc, page_index: int, text_layer: bool) -> Dict[str, Any]:
+    """Build the record of a single page (0-based index). Images are filled in later."""
+    page_result: Dict[str, Any] = {
+        "page": page_index + 1,
+        "width": 0,
+        "height": 0,
+        "text": None,
+        "text_ok": False,
+        "image_xrefs": [],
+        "images": [],
+    }
+
+    if text_layer and reader is not None:
+        try:
+            page_result["text"] = reader.pages[page_index].extract_text() or ""
+            page_result["text_ok"] = True
+        except Exception:
+            page_result["text_ok"] = False
+
+    if doc is not None:
+        try:
+            page = doc[page_index]
+            page_result["width"] = page.rect.width
+            page_result["height"] = page.rect.height
+            page_result["image_xrefs"] = [img_info[0] for img_info in page.get_images(full=True)]
+        except Exception:
+            pass
+
+    return page_result
+
+
+def _decode_image(doc, xref: int) -> Optional[Dict[str, Any]]:
+    """Decode an embedded image by xref; None if it can't be decoded or is too small."""
+    try:
+        base_image = doc.extract_image(xref)
+    except Exception:
+        return None
+    if not base_image or not base_image.get("image"):
+        return None
+
+    width = base_image.get("width", 0)
+    height = base_image.get("height", 0)
+
+    # Skip very small images (likely icons/decorations)
+    if width < 50 or height < 50:
+        return None
+
+    img_format = base_image.get("ext", "png")
+    return {
+        "xref": xref,
+        "width": width,
+        "height": height,
+        "format": img_format,
+        "mime_type": f"image/{img_format}" if img_format != "unknown" else "image/png",
+        "data": base_image["image"],
+    }
+
+
+def _collect_images(doc, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill page["images"] with one record per image placement and return the unique images.
+
+    Each xref is decoded once, and xrefs whose bytes hash to an already seen image are
+    folded into it. Every placement carries the 'image_id' of its unique image; only
+    the first placement has 'is_duplicate' False and holds the raw 'data'.
+    """
+    decoded: Dict[int, Optional[Dict[str, Any]]] = {}
+    by_hash: Dict[str, Dict[str, Any]] = {}
+    unique: List[Dict[str, Any]] = []
+    placed: set = set()
+
+    for page in pages:
+        for img_index, xref in enumerate(page["image_xrefs"], start=1):
+            if xref not in decoded:
+                info = _decode_image(doc, xref)
+                if info is not None:
+                    content_hash = hashlib.sha1(info["data"]).hexdigest()
+                    first = by_hash.get(content_hash)
+                    if first is None:
+                        info["image_id"] = len(unique)
+                        info["content_hash"] = content_hash
+                        info["ocr_text"] = ""
+                        by_hash[content_hash] = info
+                        unique.append(info)
+                    else:
+                        info = first
+                decoded[xref] = info
+
+            info = decoded[xref]
+            if info is None:
+                continue
+
+            is_duplicate = info["image_id"] in placed
+            placed.add(info["image_id"])
+            page["images"].append({
+                "page": page["page"],
+                "index": img_index,
+                "xref": xref,
+                "image_id": info["image_id"],
+                "is_duplicate": is_duplicate,
+                "width": info["width"],
+                "height": info["height"],
+                "format": info["format"],
+                "mime_type": info["mime_type"],
+                "ocr_text": "",
+                "data": None if is_duplicate else info["data"],
+            })
+
+    return unique
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The shared process pool, grown to at least `workers` processes. Workers are spawned:
+    forking this multi-threaded process could hand children locks held by other threads.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a pool that failed (e.g. a worker died) so the next job starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shards(items: Sequence[Any], count: int) -> List[List[Any]]:
+    """`items` split into at most `count` contiguous, non-empty runs."""
+    size = -(-len(items) // max(1, count))
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def _worker_document(pdf_key: str, pdf_bytes: bytes) -> tuple:
+    global _worker_pdf
+    if _worker_pdf is None or _worker_pdf[0] != pdf_key:
+        if _worker_pdf is not None and _worker_pdf[2] is not None:
+            _worker_pdf[2].close()
+        _, reader, doc = _open_pdf(pdf_bytes)
+        _worker_pdf = (pdf_key, reader, doc)
+    return _worker_pdf
+
+
+def _analyze_pages_in_worker(
+    pdf_key: str, pdf_bytes: bytes, page_indices: List[int], text_layer: bool
+) -> List[Dict[str, Any]]:
+    _, reader, doc = _worker_document(pdf_key, pdf_bytes)
+    return [_analyze_page(reader, doc, i, text_layer) for i in page_indices]
+
+
+def _ocr_images_in_worker(pdf_key: str, pdf_bytes: bytes, xrefs: List[int]) -> List[str]:
+    _, _, doc = _worker_document(pdf_key, pdf_bytes)
+    texts = []
+    for xref in xrefs:
+        info = _decode_image(doc, xref)
+        texts.append(_image_ocr_text(info["data"]) if info else "")
+    return texts
+
+
+def analyze_pdf(
+    pdf_bytes: bytes,
+    text_layer: bool = True,
+    images: bool = True,
+    workers: int = 1,
+    min_parallel_pages: int = 4,
+) -> List[Dict[str, Any]]:
+    """
+    Analyze every page of a PDF in a single pass and return page records in page order.
+
+    `text_layer` and `images` control whether the text layer is extracted and whether
+    embedded images are decoded and OCR'd; page geometry and image xrefs are always
+    recorded. Images are OCR'd once per unique xref/content hash, and repeated
+    placements reuse that result. When the document has at least `min_parallel_pages`
+    pages and `workers` > 1, pages and image OCR are sharded across a process pool;
+    otherwise they are processed in-process.
+    """
+    _, reader, doc = _open_pdf(pdf_bytes)
+    try:
+        page_count = _page_count(reader, doc)
+        if page_count == 0:
+            return []
+
+        workers = min(max(1, workers), page_count)
+        executor: Optional[ProcessPoolExecutor] = None
+        pdf_key = ""
+        if workers > 1 and page_count >= min_parallel_pages:
+            try:
+                executor = _get_pool(workers)
+                pdf_key = hashlib.sha256(pdf_bytes).hexdigest()
+            except Exception as e:
+                print(f"Parallel PDF extraction unavailable, falling back to serial: {e}")
+                executor = None
+
+        pages: Optional[List[Dict[str, Any]]] = None
+        if executor is not None:
+            try:
+                # A few shards per worker balance uneven pages; each shard ships the PDF once
+                futures = [
+                    executor.submit(_analyze_pages_in_worker, pdf_key, pdf_bytes, shard, text_layer)
+                    for shard in _shards(range(page_count), workers * 2)
+                ]
+                pages = [page for future in futures for page in future.result()]
+            except Exception as e:
+                print(f"Parallel PDF extraction failed, falling back to serial: {e}")
+                _discard_pool(executor)
+                executor = None
+        if pages is None:
+            pages = [_analyze_page(reader, doc, i, text_layer) for i in range(page_count)]
+
+        if images and doc is not None:
+            unique = _collect_images(doc, pages)
+
+            ocr_texts: Optional[List[str]] = None
+            if executor is not None and len(unique) > 1:
+                try:
+                    futures = [
+                        executor.submit(_ocr_images_in_worker, pdf_key, pdf_bytes, shard)
+                        for shard in _shards([img["xref"] for img in unique], workers)
+                    ]
+                    ocr_texts = [text for future in futures for text in future.result()]
+                except Exception as e:
+                    print(f"Parallel image OCR failed, falling back to serial: {e}")
+                    _discard_pool(executor)
+            if ocr_texts is None:
+                ocr_texts = [_image_ocr_text(img["data"]) for img in unique]
+
+            for page in pages:
+                for img in page["images"]:
+                    img["ocr_text"] = ocr_texts[img["image_id"]]
+
+        return pages
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+# A page object's type entry ("/Type /Pages" is the page tree node)
+_PAGE_OBJECT = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+
+
+def estimate_pdf_page_count(pdf_bytes: bytes) -> Optional[int]:
+    """
+    Page count from a byte scan for page objects, without parsing the document. None
+    when pages are not visible in the raw bytes (e.g. packed into object streams).
+    """
+    count = len(_PAGE_OBJECT.findall(pdf_bytes))
+    return count or None
+
+
+def format_text_layer(pages: List[Dict[str, Any]]) -> Optional[str]:
+    """Join per-page text into the '--- PAGE n ---' layout."""
+    if not pages or not all(p.get("text_ok") for p in pages):
+        return None
+    parts = [f"--- PAGE {p['page']} ---\n{p['text']}\n" for p in pages]
+    result = "\n".join(parts).strip()
+    return result or None
@@ -0,0 +1,121 @@
+"""
+Adaptive poll scheduling for long-running operations (Azure Document Intelligence).
+The first poll is short (or lands near the learned completion time for documents of
+that size), later polls back off exponentially up to the configured interval. Completion
+latency is learned per page-count bucket and poll counts are recorded per operation.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Upper bounds (inclusive) of the page-count buckets used for latency estimates.
+_PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+def _page_bucket(page_count: Optional[int]) -> str:
+    if not page_count or page_count < 1:
+        return "unknown"
+    for upper in _PAGE_BUCKETS:
+        if page_count <= upper:
+            return f"<={upper}"
+    return f">{_PAGE_BUCKETS[-1]}"
+
+
+class PollOperation:
+    """Delay schedule of a single operation, created by AdaptivePollScheduler.start()."""
+
+    def __init__(self, scheduler: "AdaptivePollScheduler", page_count: Optional[int]) -> None:
+        self._scheduler = scheduler
+        self.page_count = page_count
+        self.started = time.time()
+        self.polls = 0
+        self._delay: Optional[float] = None
+
+    def next_delay(self, retry_after: float = 0.0) -> float:
+        """Seconds to wait before the next poll."""
+        self.polls += 1
+        if self._delay is None:
+            # First poll: near the learned completion time (or the short minimum).
+            # The backoff sequence still starts from the minimum, so an operation that
+            # is not done yet is most likely close to finishing and polled again soon.
+            self._delay = self._scheduler.min_first_delay
+            delay = self._scheduler.first_delay(self.page_count)
+        else:
+            self._delay = min(self._delay * self._scheduler.backoff, self._scheduler.max_interval)
+            delay = self._delay
+
+        # Never poll sooner than the service asked with Retry-After; the schedule only
+        # shortens waits it did not ask for (the overall poll timeout still bounds it)
+        return max(delay, retry_after)
+
+    def finish(self, status: str, page_count: Optional[int] = None) -> None:
+        self._scheduler.record(self, status, page_count or self.page_count)
+
+
+class AdaptivePollScheduler:
+    def __init__(self, max_interval: float, first_delay: float = 0.25, backoff: float = 2.0) -> None:
+        self.max_interval = max(0.05, float(max_interval))
+        self.min_first_delay = max(0.05, min(float(first_delay), self.max_interval))
+        self.backoff = max(1.0, float(backoff))
+
+        self._lock = threading.Lock()
+        self._estimates: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._operations = 0
+        self._polls = 0
+
+    def start(self, page_count: Optional[int] = None) -> PollOperation:
+        return PollOperation(self, page_count)
+
+    def estimate(self, page_count: Optional[int]) -> Optional[float]:
+        with self._lock:
+            return self._estimates.get(_page_bucket(page_count))
+
+    def first_delay(self, page_count: Optional[int]) -> float:
+        # Poll slightly before the expected completion so fast operations are not
+        # overshot; never wait less than the minimum first delay.
+        estimate = self.estimate(page_count)
+        if estimate is None:
+            return self.min_first_delay
+        return max(self.min_first_delay, estimate * 0.8)
+
+    def record(self, op: PollOperation, status: str, page_count: Optional[int]) -> None:
+        elapsed = time.time() - op.started
+        with self._lock:
+            self._operations += 1
+            self._polls += op.polls
+            self._recent.append({
+                "status": status,
+                "page_count": page_count,
+                "polls": op.polls,
+                "elapsed_seconds": round(elapsed, 3),
+            })
+            if status != "succeeded":
+                return
+            for bucket in {_page_bucket(op.page_count), _page_bucket(page_count)}:
+                previous = self._estimates.get(bucket)
+                # Exponentially weighted moving average of completion latency.
+                self._estimates[bucket] = elapsed if previous is None else previous * 0.7 + elapsed * 0.3
+                self._samples[bucket] = self._samples.get(bucket, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "operations": self._operations,
+                "polls": self._polls,
+                "avg_polls_per_operation": round(self._polls / self._operations, 2) if self._operations else 0.0,
+                "latency_estimates": {
+                    bucket: {"seconds": round(est, 3), "samples": self._samples.get(bucket, 0)}
+                    for bucket, est in self._estimates.items()
+                },
+                "recent": list(self._recent),
+            }
+
+
+azure_di_poll_scheduler = AdaptivePollScheduler(
+    max_interval=float((os.getenv("AZURE_DI_POLL_INTERVAL_SECONDS", "2.5").strip() or "2.5")),
+    first_delay=float((os.getenv("AZURE_DI_FIRST_POLL_SECONDS", "0.25").strip() or "0.25")),
+)
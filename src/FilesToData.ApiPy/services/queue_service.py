@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from azure.core.exceptions import ResourceExistsError
 from azure.storage.queue import QueueClient
@@ -32,7 +32,8 @@ class QueueService:
 
         return v
 
-    def enqueue(self, queue_name: str, message: Dict[str, Any]) -> str:
+    def enqueue(self, queue_name: str, message: Dict[str, Any], visibility_timeout: Optional[int] = None) -> str:
+        """Send a message; with visibility_timeout it is delivered only after that many seconds."""
         client_kwargs: Dict[str, Any] = {}
         if TextBase64EncodePolicy is not None:
             client_kwargs["message_encode_policy"] = TextBase64EncodePolicy()
@@ -44,7 +45,7 @@ class QueueService:
             pass
 
         message_json = json.dumps(message, ensure_ascii=False)
-        receipt = queue_client.send_message(message_json)
+        receipt = queue_client.send_message(message_json, visibility_timeout=visibility_timeout)
         return receipt.id
 
 
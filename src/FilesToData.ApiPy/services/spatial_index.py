@@ -0,0 +1,262 @@
+"""
+Spatial index over OCR word boxes.
+A uniform grid over the word bounding boxes of a page image (pixel coordinates), with
+text, confidence and block/paragraph/line ids per word. It is built once per page and
+kept in a bounded LRU, so ROI text, region grouping and template label lookups on the
+same page are in-memory rectangle queries instead of new OCR runs.
+
+Word keys: text, conf, x, y, width, height, block_num, par_num, line_num, word_num
+"""
+import bisect
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+Word = Dict[str, Any]
+
+_TOKEN_STRIP = re.compile(r"^[^\w#]+|[^\w#]+$", re.UNICODE)
+
+
+def _normalize_token(token: str) -> str:
+    return _TOKEN_STRIP.sub("", token).upper()
+
+
+def _line_key(word: Word) -> Tuple[int, int, int]:
+    return (word.get("block_num", 0), word.get("par_num", 0), word.get("line_num", 0))
+
+
+def _reading_order(word: Word) -> Tuple[int, int, int, int]:
+    return _line_key(word) + (word.get("word_num", 0),)
+
+
+class WordIndex:
+    def __init__(self, words: Iterable[Word], width: int = 0, height: int = 0, cell_size: Optional[int] = None) -> None:
+        self.words: List[Word] = [w for w in words if w.get("text")]
+        self.width = width or max((w["x"] + w["width"] for w in self.words), default=0)
+        self.height = height or max((w["y"] + w["height"] for w in self.words), default=0)
+
+        if cell_size is None:
+            # A few text lines per cell keeps candidate lists short without
+            # spreading a word over many cells.
+            heights = sorted(w["height"] for w in self.words if w["height"] > 0)
+            cell_size = max(32, heights[len(heights) // 2] * 4) if heights else 64
+        self.cell_size = int(cell_size)
+
+        self._lines: Optional[List[List[Word]]] = None
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for i, w in enumerate(self.words):
+            for key in self._cells(w["x"], w["y"], w["x"] + w["width"], w["y"] + w["height"]):
+                self._grid.setdefault(key, []).append(i)
+
+    @classmethod
+    def from_tesseract(cls, data: Dict[str, List[Any]], width: int = 0, height: int = 0) -> "WordIndex":
+        """Build from pytesseract.image_to_data(..., output_type=DICT)."""
+        return cls(tesseract_words(data), width=width, height=height)
+
+    @classmethod
+    def from_azure_layout(cls, layout: Dict[str, Any], width: int = 0, height: int = 0) -> "WordIndex":
+        """Build from the page layout of OcrService._azure_di_page_layout (boxes as [x0, y0, x1, y1])."""
+        lines = sorted(layout.get("lines", []), key=lambda ln: ln["offset"])
+        starts = [ln["offset"] for ln in lines]
+        words = []
+        for i, w in enumerate(layout.get("words", [])):
+            box = w.get("box")
+            if not box:
+                continue
+            offset = w.get("offset", 0)
+            line_num = bisect.bisect_right(starts, offset) - 1
+            if line_num < 0 or offset >= lines[line_num]["end"]:
+                line_num = len(lines) + i  # Word outside any line: a line of its own
+            words.append({
+                "text": w.get("content", ""),
+                "conf": -1,
+                "x": int(box[0]),
+                "y": int(box[1]),
+                "width": int(round(box[2] - box[0])),
+                "height": int(round(box[3] - box[1])),
+                "block_num": 0,
+                "par_num": 0,
+                "line_num": line_num,
+                "word_num": i,
+            })
+        return cls(words, width=width, height=height)
+
+    def _cells(self, x0: float, y0: float, x1: float, y1: float) -> Iterable[Tuple[int, int]]:
+        size = self.cell_size
+        for cx in range(int(x0) // size, int(x1) // size + 1):
+            for cy in range(int(y0) // size, int(y1) // size + 1):
+                yield cx, cy
+
+    def query(
+        self,
+        x: float,
+        y: float,
+        width: float,
+        height: float,
+        mode: str = "center",
+        min_conf: Optional[float] = None,
+    ) -> List[Word]:
+        """
+        Words in the rectangle, in reading order.
+        mode: 'center' (word center inside), 'intersect' (boxes overlap) or 'contain' (word fully inside).
+        min_conf: keep only words with confidence above this value.
+        """
+        x1, y1 = x + width, y + height
+        seen = set()
+        found = []
+        for key in self._cells(max(0, x), max(0, y), max(0, x1), max(0, y1)):
+            for i in self._grid.get(key, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                w = self.words[i]
+                wx1, wy1 = w["x"] + w["width"], w["y"] + w["height"]
+                if mode == "contain":
+                    hit = w["x"] >= x and w["y"] >= y and wx1 <= x1 and wy1 <= y1
+                elif mode == "intersect":
+                    hit = w["x"] < x1 and wx1 > x and w["y"] < y1 and wy1 > y
+                else:
+                    cx, cy = w["x"] + w["width"] / 2, w["y"] + w["height"] / 2
+                    hit = x <= cx <= x1 and y <= cy <= y1
+                if hit and (min_conf is None or w.get("conf", 0) > min_conf):
+                    found.append(w)
+        found.sort(key=_reading_order)
+        return found
+
+    def text_in(self, x: float, y: float, width: float, height: float, mode: str = "center", min_conf: Optional[float] = None) -> str:
+        """Text of the words in the rectangle: words joined by spaces, lines by newlines."""
+        lines: "OrderedDict[Tuple[int, int, int], List[str]]" = OrderedDict()
+        for w in self.query(x, y, width, height, mode=mode, min_conf=min_conf):
+            lines.setdefault(_line_key(w), []).append(w["text"])
+        return "\n".join(" ".join(texts) for texts in lines.values())
+
+    def blocks(self, min_conf: Optional[float] = None) -> "OrderedDict[int, List[Word]]":
+        """Words grouped by block number, in OCR order."""
+        grouped: "OrderedDict[int, List[Word]]" = OrderedDict()
+        for w in self.words:
+            if min_conf is None or w.get("conf", 0) > min_conf:
+                grouped.setdefault(w.get("block_num", 0), []).append(w)
+        return grouped
+
+    def lines(self) -> List[List[Word]]:
+        """Words grouped by line, in reading order."""
+        if self._lines is None:
+            grouped: "OrderedDict[Tuple[int, int, int], List[Word]]" = OrderedDict()
+            for w in sorted(self.words, key=_reading_order):
+                grouped.setdefault(_line_key(w), []).append(w)
+            self._lines = list(grouped.values())
+        return self._lines
+
+    def find(self, phrase: str) -> List[Dict[str, Any]]:
+        """
+        Occurrences of a (case-insensitive, punctuation-trimmed) phrase as consecutive
+        words of a line. Each match has 'text' and its bounding box.
+        """
+        tokens = [t for t in (_normalize_token(p) for p in phrase.split()) if t]
+        if not tokens:
+            return []
+
+        matches = []
+        for line in self.lines():
+            normalized = [_normalize_token(w["text"]) for w in line]
+            for start in range(len(line) - len(tokens) + 1):
+                if normalized[start:start + len(tokens)] != tokens:
+                    continue
+                span = line[start:start + len(tokens)]
+                x0 = min(w["x"] for w in span)
+                y0 = min(w["y"] for w in span)
+                x1 = max(w["x"] + w["width"] for w in span)
+                y1 = max(w["y"] + w["height"] for w in span)
+                matches.append({
+                    "text": " ".join(w["text"] for w in span),
+                    "x": x0,
+                    "y": y0,
+                    "width": x1 - x0,
+                    "height": y1 - y0,
+                    "block_num": span[0].get("block_num", 0),
+                    "line_num": span[0].get("line_num", 0),
+                })
+        return matches
+
+
+def tesseract_words(data: Dict[str, List[Any]]) -> List[Word]:
+    """Word records (JSON-serializable) from pytesseract.image_to_data(..., output_type=DICT)."""
+    words = []
+    for i in range(len(data.get("text", []))):
+        text = str(data["text"][i]).strip()
+        if not text:
+            continue
+        try:
+            conf = int(float(data["conf"][i]))
+        except (TypeError, ValueError):
+            conf = 0
+        words.append({
+            "text": text,
+            "conf": conf if conf != -1 else 0,
+            "x": int(data["left"][i]),
+            "y": int(data["top"][i]),
+            "width": int(data["width"][i]),
+            "height": int(data["height"][i]),
+            "block_num": int(data["block_num"][i]),
+            "par_num": int(data["par_num"][i]),
+            "line_num": int(data["line_num"][i]),
+            "word_num": int(data["word_num"][i]),
+        })
+    return words
+
+
+class WordIndexCache:
+    """Bounded LRU of built indexes; each key is built at most once at a time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._max_entries = int((os.getenv("SPATIAL_INDEX_MAX_PAGES", "32").strip() or "32"))
+        self._entries: "OrderedDict[str, WordIndex]" = OrderedDict()
+        self._building: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._builds = 0
+
+    def get(self, key: str) -> Optional[WordIndex]:
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            return index
+
+    def get_or_build(self, key: str, build: Callable[[], Optional[WordIndex]]) -> Optional[WordIndex]:
+        index = self.get(key)
+        if index is not None:
+            return index
+
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            index = self.get(key)
+            if index is not None:
+                return index
+            index = build()
+            with self._lock:
+                self._building.pop(key, None)
+                if index is None:
+                    return None
+                self._builds += 1
+                self._entries[key] = index
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+            return index
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": len(self._entries),
+                "max_pages": self._max_entries,
+                "hits": self._hits,
+                "builds": self._builds,
+            }
+
+
+word_index_cache = WordIndexCache()
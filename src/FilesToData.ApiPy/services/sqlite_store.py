@@ -0,0 +1,230 @@
+"""
+SQLite job store: jobs, results and masking logs in an embedded database file.
+Runs in WAL mode so HTTP readers don't block the queue workers writing job status, and
+is shared by every worker process on the host. Jobs are indexed by status, mode and
+(created_at, id), the keyset used for listings; the remaining job fields are kept as JSON.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .job_status import check_transition
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            TEXT PRIMARY KEY,
+    status        TEXT NOT NULL,
+    mode          TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT,
+    error_message TEXT,
+    claim_id      TEXT,
+    lease_expiry  REAL,
+    data          TEXT NOT NULL
+);
+-- Listing indexes end with the (created_at, id) keyset
+CREATE INDEX IF NOT EXISTS idx_jobs_keyset ON jobs (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_keyset ON jobs (status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_mode_keyset ON jobs (mode, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_mode_keyset ON jobs (status, mode, created_at, id);
+
+CREATE TABLE IF NOT EXISTS results (
+    job_id     TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS masking_logs (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    data   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_masking_logs_job_id ON masking_logs (job_id, id);
+"""
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class SqliteJobStore:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = json.loads(row["data"])
+        job["status"] = row["status"]
+        job["updated_at"] = row["updated_at"]
+        job["error_message"] = row["error_message"]
+        return job
+
+    # Jobs
+    def create_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, mode, created_at, updated_at, error_message, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job["id"],
+                    str(job.get("status") or "").upper(),
+                    str(job.get("mode") or "").upper(),
+                    job.get("created_at") or _utc_now_iso(),
+                    job.get("updated_at"),
+                    job.get("error_message"),
+                    json.dumps(job, ensure_ascii=False),
+                ),
+            )
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT status, updated_at, error_message, data FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def list_jobs(
+        self,
+        status: Optional[str] = None,
+        mode: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Jobs newest first, optionally only those after the keyset position (created_at, id)."""
+        where = []
+        params: List[Any] = []
+        if status:
+            where.append("status = ?")
+            params.append(status.upper())
+        if mode:
+            where.append("mode = ?")
+            params.append(mode.upper())
+        if after is not None:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        sql = "SELECT status, updated_at, error_message, data FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([max(0, limit), max(0, offset)])
+        return [self._row_to_job(row) for row in self._connect().execute(sql, params)]
+
+    def update_job_status(self, job_id: str, status: str, error_message: Optional[str] = None) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error_message = ?, updated_at = ? WHERE id = ?",
+                (status.upper(), error_message, _utc_now_iso(), job_id),
+            )
+
+    def set_job_file_hash(self, job_id: str, file_hash: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE jobs SET data = json_set(data, '$.file_hash', ?) WHERE id = ?", (file_hash, job_id))
+
+    def claim_job(self, job_id: str, lease_seconds: float) -> Optional[str]:
+        """
+        Move a PENDING job (or a PROCESSING one whose lease expired) to PROCESSING under
+        a new lease. Returns the claim id, or None if the job cannot be claimed.
+        """
+        claim_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'PROCESSING', claim_id = ?, lease_expiry = ?, error_message = NULL,"
+                " updated_at = ? WHERE id = ? AND (status = 'PENDING'"
+                " OR (status = 'PROCESSING' AND (lease_expiry IS NULL OR lease_expiry <= ?)))",
+                (claim_id, now + lease_seconds, _utc_now_iso(), job_id, now),
+            )
+        return claim_id if cursor.rowcount == 1 else None
+
+    def get_job_lease_expiry(self, job_id: str) -> Optional[float]:
+        """Epoch seconds at which the current claim on a PROCESSING job expires."""
+        row = self._connect().execute("SELECT lease_expiry FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["lease_expiry"] if row is not None else None
+
+    def transition_job_status(
+        self,
+        job_id: str,
+        from_status: Union[str, Iterable[str]],
+        to_status: str,
+        error_message: Optional[str] = None,
+        claim_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Set the status only if it is currently `from_status` (and, with `claim_id`, the
+        job is still held under that claim); False otherwise.
+        """
+        expected = check_transition(from_status, to_status)
+        sql = (
+            "UPDATE jobs SET status = ?, error_message = ?, updated_at = ?"
+            + (", claim_id = NULL, lease_expiry = NULL" if to_status.upper() != "PROCESSING" else "")
+            + f" WHERE id = ? AND status IN ({', '.join('?' * len(expected))})"
+        )
+        params: List[Any] = [to_status.upper(), error_message, _utc_now_iso(), job_id, *expected]
+        if claim_id is not None:
+            sql += " AND claim_id = ?"
+            params.append(claim_id)
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(sql, params)
+        return cursor.rowcount == 1
+
+    # Results
+    def get_results(self, job_id: str) -> Any:
+        row = self._connect().execute("SELECT data FROM results WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["data"]) if row is not None else None
+
+    def get_results_version(self, job_id: str) -> Optional[str]:
+        """Opaque value that changes whenever the job's results are replaced."""
+        row = self._connect().execute("SELECT updated_at FROM results WHERE job_id = ?", (job_id,)).fetchone()
+        return row["updated_at"] if row is not None else None
+
+    def upsert_results(self, job_id: str, data: Any) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO results (job_id, data, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(job_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (job_id, json.dumps(data, ensure_ascii=False), _utc_now_iso()),
+            )
+
+    # Masking logs
+    def create_masking_log(self, log: Dict[str, Any]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO masking_logs (job_id, data) VALUES (?, ?)",
+                (str(log.get("job_id")), json.dumps(log, ensure_ascii=False, default=str)),
+            )
+
+    def get_masking_logs(self, job_id: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT data FROM masking_logs WHERE job_id = ? ORDER BY id", (job_id,)
+        ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
@@ -1,29 +1,105 @@
+import bisect
+import copy
+import itertools
+import os
 import threading
+import time
+import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .file_store import BlobFileStore, FilesystemFileStore, check_file_path
+from .job_status import check_transition, claimable
+from .sqlite_store import SqliteJobStore
+
+
+# Keyset position of a job in listings: (created_at, id), newest first
+JobKey = Tuple[str, str]
+# (status, mode) listing filter; None matches any
+IndexFilter = Tuple[Optional[str], Optional[str]]
 
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def _job_key(job: Dict[str, Any]) -> JobKey:
+    return (job.get("created_at") or "", job["id"])
+
+
+def _index_filters(job: Dict[str, Any]) -> Tuple[IndexFilter, ...]:
+    status = str(job.get("status", "")).upper()
+    mode = str(job.get("mode", "")).upper()
+    return ((None, None), (status, None), (None, mode), (status, mode))
+
+
 class SupabaseService:
+    """
+    In-memory store. Writes lock only the stripe of the job (or file) they touch, and
+    stored job dicts are never mutated: writers publish a new dict, readers get a copy.
+    """
+
     def __init__(self) -> None:
-        self._lock = threading.Lock()
+        stripes = max(1, int((os.getenv("STORAGE_LOCK_STRIPES", "64").strip() or "64")))
+        self._stripes = [threading.Lock() for _ in range(stripes)]
         self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Job id -> (claim id, lease expiry as epoch seconds) of PROCESSING jobs
+        self._leases: Dict[str, Tuple[str, float]] = {}
         self._results: Dict[str, Any] = {}
+        self._results_versions: Dict[str, int] = {}
+        self._versions = itertools.count(1)
         self._masking_logs: Dict[str, List[Dict[str, Any]]] = {}
         self._files: Dict[str, bytes] = {}
+        # (status, mode) filter (None = any) -> (lock, job keys in ascending order).
+        # Each list has its own lock, taken after a stripe lock and never with another.
+        self._job_index: Dict[IndexFilter, Tuple[threading.Lock, List[JobKey]]] = {}
+
+    def _stripe(self, key: str) -> threading.Lock:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _index(self, index_filter: IndexFilter) -> Tuple[threading.Lock, List[JobKey]]:
+        entry = self._job_index.get(index_filter)
+        if entry is None:
+            entry = self._job_index.setdefault(index_filter, (threading.Lock(), []))
+        return entry
+
+    def _publish_job(self, job: Dict[str, Any]) -> None:
+        # Caller holds the job's stripe lock. The job is visible before it is indexed,
+        # and only the index lists whose membership changes are touched.
+        previous = self._jobs.get(job["id"])
+        self._jobs[job["id"]] = job
+        new_key = _job_key(job)
+        new_filters = set(_index_filters(job))
+        if previous is not None:
+            old_key = _job_key(previous)
+            old_filters = set(_index_filters(previous))
+            for index_filter in old_filters:
+                if old_key == new_key and index_filter in new_filters:
+                    continue
+                lock, keys = self._index(index_filter)
+                with lock:
+                    i = bisect.bisect_left(keys, old_key)
+                    if i < len(keys) and keys[i] == old_key:
+                        del keys[i]
+        else:
+            old_key, old_filters = None, set()
+        for index_filter in new_filters:
+            if old_key == new_key and index_filter in old_filters:
+                continue
+            lock, keys = self._index(index_filter)
+            with lock:
+                bisect.insort(keys, new_key)
 
     # Jobs
     def create_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
-        with self._lock:
-            self._jobs[job["id"]] = job
+        with self._stripe(job["id"]):
+            self._leases.pop(job["id"], None)
+            self._publish_job(dict(job))
         return job
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        with self._lock:
-            return self._jobs.get(job_id)
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
 
     def list_jobs(
         self,
@@ -31,57 +107,260 @@ class SupabaseService:
         mode: Optional[str] = None,
         limit: int = 50,
         offset: int = 0,
+        after: Optional[JobKey] = None,
     ) -> List[Dict[str, Any]]:
-        with self._lock:
-            jobs = list(self._jobs.values())
-
-        if status:
-            jobs = [j for j in jobs if str(j.get("status", "")).upper() == status.upper()]
-        if mode:
-            jobs = [j for j in jobs if str(j.get("mode", "")).upper() == mode.upper()]
+        """Jobs newest first, optionally only those after the keyset position `after`."""
+        index_filter = (status.upper() if status else None, mode.upper() if mode else None)
+        # Reads never create index entries, so arbitrary filter values cost nothing
+        entry = self._job_index.get(index_filter)
+        if entry is None:
+            return []
+        lock, keys = entry
 
-        jobs.sort(key=lambda j: j.get("created_at") or "", reverse=True)
-        return jobs[offset : offset + limit]
+        # Walk the index newest first in chunks, bounded by key rather than position so
+        # concurrent inserts don't shift the window. A job whose status changed after it
+        # was indexed may still sit in its old list; it is skipped and the scan goes on,
+        # so a page is only short when the index is exhausted.
+        jobs: List[Dict[str, Any]] = []
+        limit = max(0, limit)
+        skip = max(0, offset)
+        bound = tuple(after) if after is not None else None
+        while len(jobs) < limit:
+            with lock:
+                end = bisect.bisect_left(keys, bound) if bound is not None else len(keys)
+                chunk = keys[max(0, end - (limit - len(jobs) + skip)):end]
+            if not chunk:
+                break
+            bound = chunk[0]
+            for _, job_id in reversed(chunk):
+                job = self._jobs.get(job_id)
+                if job is None or index_filter not in _index_filters(job):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                jobs.append(dict(job))
+                if len(jobs) == limit:
+                    break
+        return jobs
 
     def update_job_status(self, job_id: str, status: str, error_message: Optional[str] = None) -> None:
-        with self._lock:
+        with self._stripe(job_id):
             job = self._jobs.get(job_id)
             if not job:
                 return
-            job["status"] = status
-            job["error_message"] = error_message
-            job["updated_at"] = _utc_now_iso()
-            self._jobs[job_id] = job
+            self._publish_job(dict(job, status=status, error_message=error_message, updated_at=_utc_now_iso()))
+
+    def set_job_file_hash(self, job_id: str, file_hash: str) -> None:
+        with self._stripe(job_id):
+            job = self._jobs.get(job_id)
+            if job:
+                self._publish_job(dict(job, file_hash=file_hash))
+
+    def claim_job(self, job_id: str, lease_seconds: float) -> Optional[str]:
+        """
+        Move a PENDING job (or a PROCESSING one whose lease expired) to PROCESSING under
+        a new lease. Returns the claim id, or None if the job cannot be claimed.
+        """
+        with self._stripe(job_id):
+            job = self._jobs.get(job_id)
+            if not job or not claimable(job.get("status"), self._leases.get(job_id, (None, None))[1]):
+                return None
+            claim_id = uuid.uuid4().hex
+            self._leases[job_id] = (claim_id, time.time() + lease_seconds)
+            self._publish_job(dict(job, status="PROCESSING", error_message=None, updated_at=_utc_now_iso()))
+            return claim_id
+
+    def get_job_lease_expiry(self, job_id: str) -> Optional[float]:
+        """Epoch seconds at which the current claim on a PROCESSING job expires."""
+        lease = self._leases.get(job_id)
+        return lease[1] if lease is not None else None
+
+    def transition_job_status(
+        self,
+        job_id: str,
+        from_status: Union[str, Iterable[str]],
+        to_status: str,
+        error_message: Optional[str] = None,
+        claim_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Set the status only if it is currently `from_status` (and, with `claim_id`, the
+        job is still held under that claim); False otherwise.
+        """
+        expected = check_transition(from_status, to_status)
+        with self._stripe(job_id):
+            job = self._jobs.get(job_id)
+            if not job or str(job.get("status", "")).upper() not in expected:
+                return False
+            if claim_id is not None and self._leases.get(job_id, (None, None))[0] != claim_id:
+                return False
+            if to_status.upper() != "PROCESSING":
+                self._leases.pop(job_id, None)
+            self._publish_job(
+                dict(job, status=to_status.upper(), error_message=error_message, updated_at=_utc_now_iso())
+            )
+            return True
 
     # Results
     def get_results(self, job_id: str) -> Any:
-        with self._lock:
-            return self._results.get(job_id)
+        # Each reader gets its own copy; the stored snapshot is never handed out
+        return copy.deepcopy(self._results.get(job_id))
+
+    def get_results_version(self, job_id: str) -> Optional[str]:
+        """Opaque value that changes whenever the job's results are replaced."""
+        version = self._results_versions.get(job_id)
+        return str(version) if version is not None else None
 
     def upsert_results(self, job_id: str, data: Any) -> None:
-        with self._lock:
-            self._results[job_id] = data
+        # Store a private snapshot so later changes to the caller's object don't leak in.
+        # The version is bumped after the data so a reader that sees the new version also
+        # sees the new data.
+        self._results[job_id] = copy.deepcopy(data)
+        self._results_versions[job_id] = next(self._versions)
 
     # Masking logs
     def create_masking_log(self, log: Dict[str, Any]) -> None:
         job_id = str(log.get("job_id"))
-        with self._lock:
-            self._masking_logs.setdefault(job_id, []).append(log)
+        with self._stripe(job_id):
+            self._masking_logs[job_id] = self._masking_logs.get(job_id, []) + [dict(log)]
 
     def get_masking_logs(self, job_id: str) -> List[Dict[str, Any]]:
-        with self._lock:
-            return list(self._masking_logs.get(job_id, []))
+        return [dict(log) for log in self._masking_logs.get(job_id, [])]
 
     # Storage
     def upload_file(self, file_path: str, content: bytes) -> None:
-        with self._lock:
-            self._files[file_path] = content
+        check_file_path(file_path)
+        # Uploads may be views into a request body; keep an owned copy
+        self._files[file_path] = bytes(content)
 
     def download_file(self, file_path: str) -> bytes:
-        with self._lock:
-            if file_path not in self._files:
-                raise FileNotFoundError(f"File not found in in-memory storage: {file_path}")
-            return self._files[file_path]
+        data = self._files.get(file_path)
+        if data is None:
+            raise FileNotFoundError(f"File not found in in-memory storage: {file_path}")
+        return data
+
+    def file_size(self, file_path: str) -> int:
+        return len(self.download_file(file_path))
+
+    def download_range(self, file_path: str, start: int, length: int) -> bytes:
+        """`length` bytes from offset `start` (fewer at the end of the file)."""
+        return self.download_file(file_path)[start:start + length]
+
+
+class StorageService:
+    """Job records (jobs, results, masking logs) from one backend, file bytes from another."""
+
+    def __init__(self, records: Any, files: Any) -> None:
+        self._records = records
+        self._files = files
+
+    # Jobs
+    def create_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return self._records.create_job(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._records.get_job(job_id)
+
+    def list_jobs(
+        self,
+        status: Optional[str] = None,
+        mode: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        after: Optional[JobKey] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._records.list_jobs(status=status, mode=mode, limit=limit, offset=offset, after=after)
+
+    def update_job_status(self, job_id: str, status: str, error_message: Optional[str] = None) -> None:
+        self._records.update_job_status(job_id, status, error_message)
+
+    def transition_job_status(
+        self,
+        job_id: str,
+        from_status: Union[str, Iterable[str]],
+        to_status: str,
+        error_message: Optional[str] = None,
+        claim_id: Optional[str] = None,
+    ) -> bool:
+        return self._records.transition_job_status(job_id, from_status, to_status, error_message, claim_id)
+
+    def set_job_file_hash(self, job_id: str, file_hash: str) -> None:
+        self._records.set_job_file_hash(job_id, file_hash)
+
+    def claim_job(self, job_id: str, lease_seconds: float) -> Optional[str]:
+        return self._records.claim_job(job_id, lease_seconds)
+
+    def get_job_lease_expiry(self, job_id: str) -> Optional[float]:
+        return self._records.get_job_lease_expiry(job_id)
+
+    # Results
+    def get_results(self, job_id: str) -> Any:
+        return self._records.get_results(job_id)
+
+    def get_results_version(self, job_id: str) -> Optional[str]:
+        return self._records.get_results_version(job_id)
+
+    def upsert_results(self, job_id: str, data: Any) -> None:
+        self._records.upsert_results(job_id, data)
+
+    # Masking logs
+    def create_masking_log(self, log: Dict[str, Any]) -> None:
+        self._records.create_masking_log(log)
+
+    def get_masking_logs(self, job_id: str) -> List[Dict[str, Any]]:
+        return self._records.get_masking_logs(job_id)
+
+    # Storage
+    def upload_file(self, file_path: str, content: bytes) -> None:
+        self._files.upload_file(file_path, content)
+
+    def download_file(self, file_path: str) -> bytes:
+        return self._files.download_file(file_path)
+
+    def file_size(self, file_path: str) -> int:
+        return self._files.file_size(file_path)
+
+    def download_range(self, file_path: str, start: int, length: int) -> bytes:
+        return self._files.download_range(file_path, start, length)
+
+
+def _create_storage() -> Any:
+    """
+    Storage selected by STORAGE_BACKEND (memory | sqlite) for job records and
+    FILE_STORAGE_BACKEND (memory | filesystem | blob; default filesystem with sqlite)
+    for file bytes. Local backends keep their data under STORAGE_DIR.
+    """
+    backend = os.getenv("STORAGE_BACKEND", "memory").strip().lower() or "memory"
+    default_files = "memory" if backend == "memory" else "filesystem"
+    file_backend = os.getenv("FILE_STORAGE_BACKEND", "").strip().lower() or default_files
+    data_dir = os.getenv("STORAGE_DIR", "").strip() or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".data"
+    )
+
+    memory = SupabaseService()
+    if backend == "sqlite":
+        records: Any = SqliteJobStore(os.path.join(data_dir, "jobs.sqlite3"))
+    elif backend == "memory":
+        records = memory
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    if file_backend == "filesystem":
+        files: Any = FilesystemFileStore(os.path.join(data_dir, "files"))
+    elif file_backend == "blob":
+        files = BlobFileStore(
+            os.getenv("AzureWebJobsStorage") or "UseDevelopmentStorage=true",
+            os.getenv("STORAGE_BLOB_CONTAINER", "filestodata").strip() or "filestodata",
+        )
+    elif file_backend == "memory":
+        files = memory
+    else:
+        raise ValueError(f"Unknown FILE_STORAGE_BACKEND: {file_backend}")
+
+    if records is memory and files is memory:
+        return memory
+    return StorageService(records, files)
 
 
-supabase = SupabaseService()
+supabase = _create_storage()
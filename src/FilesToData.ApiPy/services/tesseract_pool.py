@@ -0,0 +1,218 @@
+"""
+Pool of warm Tesseract engines.
+A bounded set of tesserocr PyTessBaseAPI engines is kept loaded (traineddata read once
+per engine) and images are passed in memory. The tesserocr wheels bundle libtesseract
+but no traineddata, which is read from TESSDATA_PREFIX or a system tessdata directory.
+If tesserocr or traineddata is missing, calls fall back to pytesseract (one tesseract
+process per call) under the same concurrency bound, and /health reports mode
+"subprocess". Callers wait at most TESSERACT_QUEUE_TIMEOUT_SECONDS for a free engine.
+Per-call timings are recorded for /health.
+"""
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import tesserocr
+    HAS_TESSEROCR = True
+except ImportError:
+    HAS_TESSEROCR = False
+
+try:
+    import pytesseract
+    HAS_PYTESSERACT = True
+except ImportError:
+    HAS_PYTESSERACT = False
+
+logger = logging.getLogger(__name__)
+
+# Where distribution packages and the Windows installer put traineddata
+_TESSDATA_DIRS = (
+    "/usr/share/tesseract-ocr/*/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+    "/opt/homebrew/share/tessdata",
+    r"C:\Program Files\Tesseract-OCR\tessdata",
+)
+
+
+def _find_tessdata() -> Optional[str]:
+    """TESSDATA_PREFIX, else the tessdata directory next to TESSERACT_PATH or of the system install."""
+    configured = os.getenv("TESSDATA_PREFIX", "").strip()
+    if configured:
+        return configured
+    candidates: List[str] = []
+    tesseract_path = os.getenv("TESSERACT_PATH", "").strip()
+    if tesseract_path:
+        bin_dir = os.path.dirname(os.path.abspath(tesseract_path))
+        candidates += [os.path.join(bin_dir, "tessdata"), os.path.join(os.path.dirname(bin_dir), "share", "tessdata")]
+    for pattern in _TESSDATA_DIRS:
+        candidates += sorted(glob.glob(pattern), reverse=True)
+    for candidate in candidates:
+        if glob.glob(os.path.join(candidate, "*.traineddata")):
+            return candidate
+    return None
+
+
+# Column order of Tesseract's TSV output (same keys as pytesseract's image_to_data DICT)
+_TSV_COLUMNS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text",
+)
+
+
+def _parse_tsv(tsv: str) -> Dict[str, List[Any]]:
+    data: Dict[str, List[Any]] = {col: [] for col in _TSV_COLUMNS}
+    for row in tsv.splitlines():
+        parts = row.split("\t")
+        if len(parts) < len(_TSV_COLUMNS) - 1 or parts[0] == "level":
+            continue
+        if len(parts) == len(_TSV_COLUMNS) - 1:
+            parts.append("")  # Empty text column
+        for col, value in zip(_TSV_COLUMNS, parts):
+            if col == "text":
+                data[col].append(value)
+            elif col == "conf":
+                data[col].append(float(value))
+            else:
+                data[col].append(int(value))
+    return data
+
+
+class TesseractPool:
+    def __init__(self) -> None:
+        self._size = max(1, int((os.getenv("TESSERACT_POOL_SIZE", "").strip() or str(os.cpu_count() or 1))))
+        self._timeout = float((os.getenv("TESSERACT_QUEUE_TIMEOUT_SECONDS", "30").strip() or "30"))
+        self._tessdata = _find_tessdata()
+        self._use_tesserocr = HAS_TESSEROCR and self._tessdata is not None and (
+            (os.getenv("TESSERACT_USE_TESSEROCR", "true").strip().lower() or "true") not in ("0", "false", "no")
+        )
+        if not self._use_tesserocr and HAS_PYTESSERACT:
+            reason = "tesserocr is not installed" if not HAS_TESSEROCR else (
+                "no tessdata directory found (set TESSDATA_PREFIX)" if self._tessdata is None else "disabled"
+            )
+            logger.warning("Tesseract pool: %s; running one tesseract process per OCR call", reason)
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._size)
+        # Idle engines per language; at most `_size` engines exist in total
+        self._idle: Dict[str, "queue.LifoQueue[Any]"] = {}
+        self._engines = 0
+
+        self._calls = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_seconds = 0.0
+
+    @property
+    def mode(self) -> str:
+        return "tesserocr" if self._use_tesserocr else "subprocess"
+
+    @property
+    def available(self) -> bool:
+        return self._use_tesserocr or HAS_PYTESSERACT
+
+    def _acquire_engine(self, lang: str):
+        with self._lock:
+            idle = self._idle.setdefault(lang, queue.LifoQueue())
+        try:
+            return idle.get_nowait()
+        except queue.Empty:
+            pass
+        # A slot is free but no idle engine for this language: load one. Engines of
+        # other languages are dropped when the pool would grow past its size.
+        with self._lock:
+            if self._engines >= self._size:
+                for other_lang, other in self._idle.items():
+                    if other_lang == lang:
+                        continue
+                    try:
+                        other.get_nowait().End()
+                        self._engines -= 1
+                        break
+                    except queue.Empty:
+                        continue
+            self._engines += 1
+        try:
+            return tesserocr.PyTessBaseAPI(path=self._tessdata, lang=lang)
+        except Exception:
+            with self._lock:
+                self._engines -= 1
+            raise
+
+    def _run(self, lang: str, with_engine, with_subprocess):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self._timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError(f"No Tesseract engine available within {self._timeout:g}s")
+        acquired = time.perf_counter()
+        failed = False
+        try:
+            if self._use_tesserocr:
+                engine = self._acquire_engine(lang)
+                try:
+                    return with_engine(engine)
+                finally:
+                    engine.Clear()
+                    self._idle[lang].put(engine)
+            return with_subprocess()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._slots.release()
+            busy = time.perf_counter() - acquired
+            with self._lock:
+                self._calls += 1
+                self._errors += int(failed)
+                self._busy_seconds += busy
+                self._wait_seconds += acquired - start
+                self._max_seconds = max(self._max_seconds, busy)
+
+    def image_to_string(self, image, lang: str = "spa+eng") -> str:
+        """OCR a PIL image to plain text."""
+
+        def with_engine(engine) -> str:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+
+        return self._run(lang, with_engine, lambda: pytesseract.image_to_string(image, lang=lang))
+
+    def image_to_data(self, image, lang: str = "spa+eng") -> Dict[str, List[Any]]:
+        """OCR a PIL image to word boxes, in pytesseract's image_to_data DICT layout."""
+
+        def with_engine(engine) -> Dict[str, List[Any]]:
+            engine.SetImage(image)
+            engine.Recognize()
+            return _parse_tsv(engine.GetTSVText(0))
+
+        return self._run(
+            lang,
+            with_engine,
+            lambda: pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "tessdata": self._tessdata,
+                "size": self._size,
+                "engines": self._engines,
+                "calls": self._calls,
+                "errors": self._errors,
+                "timeouts": self._timeouts,
+                "avg_seconds": round(self._busy_seconds / self._calls, 4) if self._calls else 0.0,
+                "max_seconds": round(self._max_seconds, 4),
+                "avg_wait_seconds": round(self._wait_seconds / self._calls, 4) if self._calls else 0.0,
+            }
+
+
+tesseract_pool = TesseractPool()